@@ -1,9 +1,12 @@
-from machine import Pin, SPI
 from micropython import const
-import time
+from MI0283QT2_core import MI0283QT2_core
 import framebuf
+import micropython
 
-class MI0283QT2(object):
+#Maximal number of separate dirty regions, above it they are merged into one
+_MAX_DIRTY_RECTS = const(8)
+
+class MI0283QT2(MI0283QT2_core):
     """
     For orientation related information and more information about the display controller consult the HX8347-D datasheet
     For more information about the touch screen controller consult the XPT2046 / ADS7846 datasheet
@@ -11,372 +14,262 @@ class MI0283QT2(object):
     IMPORTANT! Keep in mind because SPI bus is shared, touch screen will not be detected while the screen is
     being drawn on.
 
-    To draw first call get_framebuf() and fill the buffer, then call draw() to draw the buffer on screen
+    To draw first call get_framebuf() and fill the buffer, then call draw() to draw the buffer on screen.
+    When only parts of the buffer change mark them with mark_dirty(), draw() will then send only those
+    regions. A single region can also be sent directly with draw(x, y, w, h)
 
     To use touch input setup a timer to poll the function touch_read()
-    """
-    
-    #Command set registers
-    POWER_CONTROL_INTERNAL_USE_1 = const(0xEA)
-    POWER_CONTROL_INTERNAL_USE_2 = const(0xEB)
-    SOURCE_CONTROL_INTERNAL_USE_1 = const(0xEC)
-    SOURCE_CONTROL_INTERNAL_USE_2 = const(0xED)
-    SOURCE_OP_CONTROL_NORMAL = const(0xE8)
-    SOURCE_OP_CONTROL_IDLE = const(0xE9)
-    DISPLAY_CONTROL_2 = const(0x27)
-    POWER_CONTROL_2 = const(0x1B)
-    POWER_CONTROL_1 = const(0x1A)
-    VCOM_CONTROL_1 = const(0x23)
-    VCOM_CONTROL_2 = const(0x24)
-    VCOM_CONTROL_3 = const(0x25)
-    OSC_CONTROL_2 = const(0x18)
-    OSC_CONTROL_1 = const(0x19)
-    DISPLAY_MODE_CONTROL = const(0x01)
-    POWER_CONTROL_6 = const(0x1F)
-    COLMOD = const(0x17)
-    PANEL_CHARACTERISTIC = const(0x36)
-    MEMORY_ACCESS_CONTROL = const(0x16)
-    COLUMN_ADDRESS_START_1 = const(0x03)
-    COLUMN_ADDRESS_START_2 = const(0x02)
-    COLUMN_ADDRESS_END_1 = const(0x05)
-    COLUMN_ADDRESS_END_2 = const(0x04)
-    ROW_ADDRESS_START_1 = const(0x07)
-    ROW_ADDRESS_START_2 = const(0x06)
-    ROW_ADDRESS_END_1 = const(0x09)
-    ROW_ADDRESS_END_2 = const(0x08)
-    DISPLAY_CONTROL_3 = const(0x28)
-    
-    #LCD commands
-    LCD_ID = const(0)
-    LCD_DATA = const((0x72)|(LCD_ID<<2))
-    LCD_REGISTER = const((0x70)|(LCD_ID<<2))
-    
-    #Touch commands
-    ADS_CMD_START = const(0x80)
-    ADS_CMD_12BIT = const(0x00)
-    ADS_CMD_8BIT = const(0x08)
-    ADS_CMD_DIFF = const(0x00)
-    ADS_CMD_X_POS = const(0x50)
-    ADS_CMD_Y_POS = const(0x10)
-    ADS_CMD_Z1_POS = const(0x30)
-    ADS_CMD_Z2_POS = const(0x40)
-    ADS_CMD_ALWAYS_ON = const(0x02)
-    ADS_CMD_POWER_OFF = const(0x00)
+    If touch_irq pin (PENIRQ of the touch screen controller) is given, touch_read() returns (-1, -1) without any
+    SPI traffic while the screen isn't touched
 
-    #Minimal pressure for touch detection
-    MIN_PRESSURE = const(2) #Value range from 1 to 254
-    
-    #Touch offset
-    X_MIN = const(170)
-    X_MAX = const(3815)
-    Y_MIN = const(286)
-    Y_MAX = const(3839)
-    
-    DISPLAY_SPI_SPEED = const(24000000) 
-    TOUCH_SPI_SPEED = const(1000000)
-    
-    #Default screen size values
-    LCD_WIDTH = const(320)
-    LCD_HEIGHT = const(240)
-    
-    #MOSI is SDI, MISO is SDO
-    def __init__(self, spi_id, sck, mosi, miso, rst, led, display_cs, touch_cs=None, orientation=0):
-         
-        # Pin setup
-        self.rst = rst
-        self.rst.init(mode = Pin.OUT)
-        self.rst_enable()
-        
-        self.led = led
-        self.led.init(mode = Pin.OUT)
-        self.led_disable()
-        
-        self.display_cs = display_cs
-        self.display_cs.init(mode = Pin.OUT)
-        self.display_cs_disable()
-        
-        if touch_cs != None:
-            self.touch_cs = touch_cs
-            self.touch_cs.init(mode = Pin.OUT)
-            self.touch_cs_disable()
-        
-        # SPI setup
-        self.spi_id = spi_id
-        self.sck = sck
-        self.mosi = mosi
-        self.miso = miso
-        self.spi = SPI(spi_id, baudrate=DISPLAY_SPI_SPEED,
-                       sck = self.sck,
-                       mosi = self.mosi,
-                       miso = self.miso)
-        
-        print(self.spi)
-        
-        self.reset()
-        
-        self.width = LCD_WIDTH
-        self.height = LCD_HEIGHT
-        self.orientation = orientation
+    Touch screens differ between units, run calibrate() once and keep the result with save_calibration(),
+    then load it with load_calibration() at startup
 
-        self.fbuf = None #setOrientation sets it
-        self.setOrientation(self.orientation)
-        
-        self.led_enable()
-                
-    """
-        Helper functions for pin setup
+    Display setup, drawing primitives and touch reading come from MI0283QT2_core
+
+    With band_rows the framebuffer covers only band_rows rows of the screen (a 20 row band takes 12.8 kB instead
+    of 150 kB). Register a draw callback with set_draw_callback(), draw() calls it for every band that has to
+    be sent with the framebuffer of the band and the screen row y0 of its first row, the callback draws the
+    screen content with y moved by -y0 (framebuf clips the rest), without it draw() raises ValueError.
+    The same callback works without bands, then it is called once with y0 = 0
+
+    color_format selects the framebuffer format, framebuf.RGB565 (default), framebuf.GS8 or framebuf.GS4_HMSB.
+    GS8 and GS4 framebuffers hold palette indexes instead of colors and take 2x and 4x less memory, draw with
+    the index as color. The palette is set with set_palette() (gray levels by default), draw() expands every
+    row to RGB565 through a lookup table into a line buffer while sending it
     """
-    def led_enable(self):
-        self.led.high()
-    
-    def led_disable(self):
-        self.led.low()
-        
-    def rst_enable(self):
-        self.rst.low()
-        
-    def rst_disable(self):
-        self.rst.high()
-        
-    def display_cs_enable(self):
-        self.display_cs.low()
-        
-    def display_cs_disable(self):
-        self.display_cs.high()
-    
-    def touch_cs_enable(self):
-        self.touch_cs.low()
-        
-    def touch_cs_disable(self):
-        self.touch_cs.high()
-        
 
-    def fill(self, color_rgb565):
-        self.set_area(0, 0, self.height-1, self.width-1)
-        self.draw_start()
-        for i in range(self.width * self.height):
-            self.draw(color_rgb565)
-        self.draw_stop()
-            
-    def set_area(self, x0, y0, x1, y1):
-        self.wr_cmd(COLUMN_ADDRESS_START_1, (x0>>0 & 0xFF)) 
-        self.wr_cmd(COLUMN_ADDRESS_START_2, (x0>>8 & 0xFF))
-        self.wr_cmd(COLUMN_ADDRESS_END_1, (x1>>0 & 0xFF)) 
-        self.wr_cmd(COLUMN_ADDRESS_END_2, (x1>>8 & 0xFF))
-        self.wr_cmd(ROW_ADDRESS_START_1, (y0>>0 & 0xFF)) 
-        self.wr_cmd(ROW_ADDRESS_START_2, (y0>>8 & 0xFF)) 
-        self.wr_cmd(ROW_ADDRESS_END_1, (y1>>0 & 0xFF)) 
-        self.wr_cmd(ROW_ADDRESS_END_2, (y1>>8 & 0xFF)) 
+    STATS_METHODS = MI0283QT2_core.STATS_METHODS + (("flush", "draw_rect"),)
+
+    #MOSI is SDI, MISO is SDO
+    def __init__(self, spi_id, sck, mosi, miso, rst, led, display_cs, touch_cs=None, orientation=0, bus=None,
+                 touch_irq=None, band_rows=0, color_format=None):
+        if color_format == None:
+            color_format = framebuf.RGB565
+        if color_format != framebuf.RGB565 and color_format != framebuf.GS8 and color_format != framebuf.GS4_HMSB:
+            raise ValueError("Framebuffer format can only be RGB565, GS8 or GS4_HMSB")
+        self.color_format = color_format
+        self.lut = None
+        self.lut4 = None
+        if color_format == framebuf.GS4_HMSB:
+            self.set_palette([((i * 17) >> 3) << 11 | ((i * 17) >> 2) << 5 | ((i * 17) >> 3) for i in range(16)])
+        elif color_format == framebuf.GS8:
+            self.set_palette([(i >> 3) << 11 | (i >> 2) << 5 | (i >> 3) for i in range(256)])
+        self.band_rows = band_rows #0 for the whole screen
+        self.band_y = 0 #screen row of the first framebuffer row
+        self.draw_cb = None
+        super().__init__(spi_id, sck, mosi, miso, rst, led, display_cs, touch_cs, orientation, bus, touch_irq)
 
-    def draw_start(self):
-        self.display_cs_enable()
-        self.wr_spi(LCD_REGISTER)
-        self.wr_spi(0x22)
-        self.display_cs_disable()
-        
-        self.display_cs_enable()
-        self.wr_spi(LCD_DATA)
-    
-    def draw_stop(self):
-        self.display_cs_disable()
-    
     def get_framebuf(self):
         return self.fbuf
+
+    def set_draw_callback(self, draw_cb):
+        """
+        Sets function draw_cb(fbuf, y0) used by draw() to draw the framebuffer, None to draw it yourself
+        """
+        self.draw_cb = draw_cb
+
+    def set_palette(self, colors):
+        """
+        Sets RGB565 colors of the palette indexes of a GS8 or GS4 framebuffer, missing colors are black.
+        The change is visible after the next draw()
+        """
+        size = 16 if self.color_format == framebuf.GS4_HMSB else 256
+        if len(colors) > size:
+            raise ValueError("Palette has too many colors")
+        #Index to color in byte order of the display
+        lut = bytearray(512)
+        for i in range(len(colors)):
+            lut[2 * i] = colors[i] >> 8
+            lut[2 * i + 1] = colors[i] & 0xFF
+        self.lut = lut
+        if self.color_format == framebuf.GS4_HMSB:
+            #Byte with two pixels to their four color bytes, the first pixel is in the high nibble
+            lut4 = bytearray(1024)
+            for b in range(256):
+                hi = (b >> 4) * 2
+                lo = (b & 0x0F) * 2
+                lut4[4 * b] = lut[hi]
+                lut4[4 * b + 1] = lut[hi + 1]
+                lut4[4 * b + 2] = lut[lo]
+                lut4[4 * b + 3] = lut[lo + 1]
+            self.lut4 = lut4
     
-    def draw(self):
-        self.draw_start()
-        self.wr_buf_spi(self.fbuf)
-        self.draw_stop()
-        
-    def touch_read(self):
+    def mark_dirty(self, x, y, w, h):
         """
-        Return reading coordinates in the form of a (x, y) touple. If the touch screen is not 
-        pressed the result will be (-1, -1)
+        Marks a region of the framebuffer as changed, so the next draw() sends it to the screen.
+        Overlapping and touching regions are merged into one
         """
-        if self.touch_cs != None:
-            
-            """
-            New SPI configuration for touch screen controller, because the SPI bus is shared and 
-            the display and touch don't support the same SPI speeds
-            """
-            self.spi = SPI(self.spi_id, baudrate = TOUCH_SPI_SPEED,
-                          sck = self.sck,
-                          mosi = self.mosi,
-                          miso = self.miso)
-            
-            #get z data
-            self.touch_cs_enable()
+        x0 = max(x, 0)
+        y0 = max(y, 0)
+        x1 = min(x + w, self.width) - 1
+        y1 = min(y + h, self.height) - 1
+        if(x0 > x1 or y0 > y1):
+            return
 
-            self.wr_spi(ADS_CMD_START | ADS_CMD_8BIT | ADS_CMD_DIFF | ADS_CMD_Z1_POS | ADS_CMD_ALWAYS_ON)
-            a1 = self.rd_spi(1)&0x7F
-            self.wr_spi(ADS_CMD_START | ADS_CMD_8BIT | ADS_CMD_DIFF | ADS_CMD_Z2_POS | ADS_CMD_ALWAYS_ON)
-            a2 = (255-self.rd_spi(1))&0x7F
-            
-            self.touch_cs_disable()
-            pressure = a1 + a2
+        rects = self.dirty
+        i = 0
+        while i < len(rects):
+            r = rects[i]
+            if(x0 <= r[2] + 1 and r[0] <= x1 + 1 and y0 <= r[3] + 1 and r[1] <= y1 + 1):
+                x0 = min(x0, r[0])
+                y0 = min(y0, r[1])
+                x1 = max(x1, r[2])
+                y1 = max(y1, r[3])
+                rects.pop(i)
+                i = 0 #grown region can now touch one that was already checked
+            else:
+                i += 1
 
-            x_raw = -1
-            y_raw = -1
-            x = -1
-            y = -1
-            if(pressure < MIN_PRESSURE):
-                return (x, y)
+        if(len(rects) >= _MAX_DIRTY_RECTS):
+            for r in rects:
+                x0 = min(x0, r[0])
+                y0 = min(y0, r[1])
+                x1 = max(x1, r[2])
+                y1 = max(y1, r[3])
+            del rects[:]
+        rects.append([x0, y0, x1, y1])
 
-            self.touch_cs_enable()
-            
-            #get x data, two times for confidence
-            self.wr_spi(ADS_CMD_START | ADS_CMD_12BIT | ADS_CMD_DIFF | ADS_CMD_X_POS | ADS_CMD_ALWAYS_ON)
-            a1 = self.rd_spi(2)
-            self.wr_spi(ADS_CMD_START | ADS_CMD_12BIT | ADS_CMD_DIFF | ADS_CMD_X_POS | ADS_CMD_ALWAYS_ON)
-            a2 = self.rd_spi(2)
-            
-            #Two bytes are read but needed information is in bits [14:3], consult datasheet for more info
-            x_raw = (a2>>3) 
+    def draw(self, x=None, y=None, w=None, h=None):
+        """
+        Sends the framebuffer to the screen. If a region is given only that region is sent, otherwise
+        the regions marked with mark_dirty() are sent. When nothing is marked the whole buffer is sent
+        """
+        if(self.fbuf_rows < self.height and self.draw_cb == None):
+            #The band buffer holds only part of the screen, only the callback can fill the other bands
+            raise ValueError("Drawing with band_rows needs a draw callback, see set_draw_callback()")
+        if x != None:
+            x0 = max(x, 0)
+            y0 = max(y, 0)
+            x1 = min(x + w, self.width) - 1
+            y1 = min(y + h, self.height) - 1
+            if(x0 <= x1 and y0 <= y1):
+                self.draw_region(x0, y0, x1, y1)
+        elif not self.dirty:
+            self.draw_region(0, 0, self.width-1, self.height-1)
+        else:
+            if self.draw_cb != None:
+                self.draw_bands(self.dirty)
+            else:
+                for r in self.dirty:
+                    self.draw_rect(r[0], r[1], r[2], r[3])
+            del self.dirty[:]
 
-            #get y data, two times for confidence
-            self.wr_spi(ADS_CMD_START | ADS_CMD_12BIT | ADS_CMD_DIFF | ADS_CMD_Y_POS | ADS_CMD_ALWAYS_ON)
-            a1 = self.rd_spi(2)
-            self.wr_spi(ADS_CMD_START | ADS_CMD_12BIT | ADS_CMD_DIFF | ADS_CMD_Y_POS | ADS_CMD_ALWAYS_ON)
-            a2 = self.rd_spi(2)
+    def draw_region(self, x0, y0, x1, y1):
+        if self.draw_cb != None:
+            self.draw_bands(((x0, y0, x1, y1),))
+        else:
+            self.draw_rect(x0, y0, x1, y1)
 
-            #Same reading procedure as for x_raw
-            y_raw = (a2>>3) 
-            
-            """
-            By default the touch controller has different orientation of x and y axis than LVGL.
-            For this reason we have to map it differently. Keep in mind such orientation 
-            will be used even when LVGL is not used.
-            """
-            if(self.orientation == 0):
-                x = self.map_touch(x_raw, X_MIN, X_MAX, 0, LCD_HEIGHT-1)
-                y = self.map_touch(y_raw, Y_MIN, Y_MAX, 0, LCD_WIDTH-1)
-            elif(self.orientation == 90):
-                x = self.map_touch(4095-y_raw, Y_MIN, Y_MAX, 0, LCD_WIDTH-1)
-                y = self.map_touch(x_raw, X_MIN, X_MAX, 0, LCD_HEIGHT-1)
-            elif(self.orientation == 180):
-                x = self.map_touch(4095-x_raw, X_MIN, X_MAX, 0, LCD_HEIGHT-1)
-                y = self.map_touch(4095-y_raw, Y_MIN, Y_MAX, 0, LCD_WIDTH-1)
-            elif(self.orientation == 270):
-                x = self.map_touch(y_raw, Y_MIN, Y_MAX, 0, LCD_WIDTH-1)
-                y = self.map_touch(4095-x_raw, X_MIN, X_MAX, 0, LCD_HEIGHT-1)
+    def draw_bands(self, rects):
+        """
+        Draws every band that intersects one of the regions with the draw callback and sends the parts of
+        the regions in it. Regions are (x0, y0, x1, y1) with inclusive corners
+        """
+        rows = self.fbuf_rows
+        y = 0
+        while y < self.height:
+            end = min(y + rows, self.height) - 1
+            drawn = False
+            for r in rects:
+                if(r[1] <= end and r[3] >= y):
+                    if not drawn:
+                        self.band_y = y
+                        self.draw_cb(self.fbuf, y)
+                        drawn = True
+                    self.draw_rect(r[0], max(r[1], y), r[2], min(r[3], end))
+            y += rows
+        self.band_y = 0
 
+    def draw_rect(self, x0, y0, x1, y1):
+        """
+        Sends framebuffer region with corners (x0, y0) and (x1, y1) (inclusive) to the screen.
+        Rows are sent as memoryview slices of the framebuffer, so nothing is copied
+        """
+        self.set_area(x0, y0, x1, y1)
+        self.draw_start()
 
-            self.touch_cs_disable()
-            
-            #Returning SPI configuration to that for display
-            self.spi = SPI(self.spi_id, baudrate=DISPLAY_SPI_SPEED,
-                          sck = self.sck,
-                          mosi = self.mosi,
-                          miso = self.miso)
-            
-            return (x, y) 
-    
-    def setOrientation(self, orientation):
-        if(orientation == 0):
-            self.wr_cmd(MEMORY_ACCESS_CONTROL, 0x08) 
-            self.width = LCD_HEIGHT
-            self.height = LCD_WIDTH
-        elif(orientation == 90):
-            self.wr_cmd(MEMORY_ACCESS_CONTROL, 0xA8) 
-            self.width = LCD_WIDTH
-            self.height = LCD_HEIGHT
-        elif(orientation == 180):
-            self.wr_cmd(MEMORY_ACCESS_CONTROL, 0xC8) 
-            self.width = LCD_HEIGHT
-            self.height = LCD_WIDTH
-        elif(orientation == 270):
-            self.wr_cmd(MEMORY_ACCESS_CONTROL, 0x68) 
-            self.width = LCD_WIDTH
-            self.height = LCD_HEIGHT
+        if self.color_format != framebuf.RGB565:
+            self.draw_rows_indexed(x0, y0, x1, y1)
+            self.draw_stop()
+            return
+
+        stride = self.width * 2
+        start = (y0 - self.band_y) * stride + x0 * 2
+        if(x0 == 0 and x1 == self.width - 1):
+            #full width rows are contiguous in the buffer
+            self.wr_buf_spi(self.fbuf_mv[start:(y1 + 1 - self.band_y) * stride])
         else:
-            raise ValueError("Orientation can only be 0, 90, 180 and 270")
-        self.orientation = orientation
-        self.fbuf = None
-        self.fbuf = framebuf.FrameBuffer(bytearray(self.width * self.height * 2), self.width, self.height, framebuf.RGB565)
-    
-    def reset(self):
-        self.display_cs_disable()
-        
-        self.rst_enable()
-        time.sleep_ms(50)
-        self.rst_disable()
-        time.sleep_ms(120)
+            end = start + (x1 - x0 + 1) * 2
+            for i in range(y1 - y0 + 1):
+                self.wr_buf_spi(self.fbuf_mv[start:end])
+                start += stride
+                end += stride
 
-        #Initial setup commands
-        
-        #driving ability
-        self.wr_cmd(POWER_CONTROL_INTERNAL_USE_1, 0x00) 
-        self.wr_cmd(POWER_CONTROL_INTERNAL_USE_2, 0x20) 
-        self.wr_cmd(SOURCE_CONTROL_INTERNAL_USE_1, 0x0C) 
-        self.wr_cmd(SOURCE_CONTROL_INTERNAL_USE_2, 0xC4) 
-        self.wr_cmd(SOURCE_OP_CONTROL_NORMAL, 0x40) 
-        self.wr_cmd(SOURCE_OP_CONTROL_IDLE, 0x38) 
-        self.wr_cmd(0xF1, 0x01) 
-        self.wr_cmd(0xF2, 0x10) 
-        self.wr_cmd(DISPLAY_CONTROL_2, 0xA3)
-        #power voltage
-        self.wr_cmd(POWER_CONTROL_2, 0x1B)
-        self.wr_cmd(POWER_CONTROL_1, 0x01)
-        self.wr_cmd(VCOM_CONTROL_2, 0x2F)
-        self.wr_cmd(VCOM_CONTROL_3, 0x57)
-        #VCOM offset
-        self.wr_cmd(VCOM_CONTROL_1, 0x8D)
-        #power on
-        self.wr_cmd(OSC_CONTROL_2, 0x36)
-        #start osc
-        self.wr_cmd(OSC_CONTROL_1, 0x01)
-        #wakeup
-        self.wr_cmd(DISPLAY_MODE_CONTROL, 0x00)
-        self.wr_cmd(POWER_CONTROL_6, 0x88)
-        time.sleep_ms(5)
-        self.wr_cmd(POWER_CONTROL_6, 0x80)
-        time.sleep_ms(5)
-        self.wr_cmd(POWER_CONTROL_6, 0x90)
-        time.sleep_ms(5)
-        self.wr_cmd(POWER_CONTROL_6, 0xD0)
-        time.sleep_ms(5)
-        #color selection
-        self.wr_cmd(COLMOD, 0x05) #0x05=65k, 0x06=262k
-        #panel characteristic
-        self.wr_cmd(PANEL_CHARACTERISTIC, 0x00)
-        #display options
-        self.wr_cmd(MEMORY_ACCESS_CONTROL, 0xA8) # 0xA8 RGB, 0xA0 BGR (even though datasheet says otherwise)
-        self.wr_cmd(COLUMN_ADDRESS_START_1, 0x00) #x0
-        self.wr_cmd(COLUMN_ADDRESS_START_2, 0x00) #x0
-        self.wr_cmd(COLUMN_ADDRESS_END_1, ((LCD_WIDTH-1)>>0)&0xFF)
-        self.wr_cmd(COLUMN_ADDRESS_END_2, ((LCD_WIDTH-1)>>8)&0xFF)
-        self.wr_cmd(ROW_ADDRESS_START_1, 0x00) #y0
-        self.wr_cmd(ROW_ADDRESS_START_2, 0x00) #y0
-        self.wr_cmd(ROW_ADDRESS_END_1, ((LCD_HEIGHT-1)>>0)&0xFF)
-        self.wr_cmd(ROW_ADDRESS_END_2, ((LCD_HEIGHT-1)>>8)&0xFF)
-        #display on
-        self.wr_cmd(DISPLAY_CONTROL_3, 0x38)
-        time.sleep_ms(50)
-        self.wr_cmd(DISPLAY_CONTROL_3, 0x3C)
-        time.sleep_ms(5)
-        
-    def wr_cmd(self, cmd, param):
-       self.display_cs_enable();
-       self.wr_spi(LCD_REGISTER);
-       self.wr_spi(cmd);
-       self.display_cs_disable();
+        self.draw_stop()
 
-       self.display_cs_enable();
-       self.wr_spi(LCD_DATA);
-       self.wr_spi(param);
-       self.display_cs_disable();
+    def draw_rows_indexed(self, x0, y0, x1, y1):
+        """
+        Sends rows of a GS8 or GS4 framebuffer region, every row is expanded into the line buffer first
+        """
+        stride = self.fbuf_stride
+        line = self.line_mv
+        size = (x1 - x0 + 1) * 2
+        pos = (y0 - self.band_y) * stride
+        if self.color_format == framebuf.GS4_HMSB:
+            #Whole bytes are expanded, the first pixel is skipped when the region starts in the low nibble
+            first = x0 >> 1
+            n = (x1 >> 1) - first + 1
+            skip = (x0 & 1) * 2
+            for i in range(y1 - y0 + 1):
+                self.expand_gs4(self.fbuf_mv, pos + first, n, line)
+                self.wr_buf_spi(line[skip:skip + size])
+                pos += stride
+        else:
+            for i in range(y1 - y0 + 1):
+                self.expand_gs8(self.fbuf_mv, pos + x0, x1 - x0 + 1, line)
+                self.wr_buf_spi(line[:size])
+                pos += stride
 
-    def rd_spi(self, num_of_bytes):
-        #reads bytes from SPI in big endian format
-        return int.from_bytes(self.spi.read(num_of_bytes), "big")
+    @micropython.native
+    def expand_gs4(self, src, start, n, dst):
+        lut = self.lut4
+        j = 0
+        for i in range(start, start + n):
+            k = src[i] << 2
+            dst[j] = lut[k]
+            dst[j + 1] = lut[k + 1]
+            dst[j + 2] = lut[k + 2]
+            dst[j + 3] = lut[k + 3]
+            j += 4
 
-    def wr_spi(self, data):
-        #important that data is wrapped with []
-        self.spi.write(bytes([data]))
-        
-    def wr_buf_spi(self, buf):
-        self.spi.write(buf)
+    @micropython.native
+    def expand_gs8(self, src, start, n, dst):
+        lut = self.lut
+        j = 0
+        for i in range(start, start + n):
+            k = src[i] << 1
+            dst[j] = lut[k]
+            dst[j + 1] = lut[k + 1]
+            j += 2
 
-    def map_touch(self, value, min_value_in, max_value_in, min_value_out, max_value_out):
-        return int((value - min_value_in) * (max_value_out - min_value_out) / (max_value_in - min_value_in) + min_value_out)
-    
\ No newline at end of file
+    def setOrientation(self, orientation):
+        super().setOrientation(orientation)
+        self.fbuf = None
+        self.fbuf_mv = None
+        if(self.band_rows > 0 and self.band_rows < self.height):
+            self.fbuf_rows = self.band_rows
+        else:
+            self.fbuf_rows = self.height
+        if self.color_format == framebuf.GS4_HMSB:
+            self.fbuf_stride = (self.width + 1) // 2
+        elif self.color_format == framebuf.GS8:
+            self.fbuf_stride = self.width
+        else:
+            self.fbuf_stride = self.width * 2
+        fbuf_data = bytearray(self.fbuf_stride * self.fbuf_rows)
+        self.fbuf_mv = memoryview(fbuf_data)
+        self.fbuf = framebuf.FrameBuffer(fbuf_data, self.width, self.fbuf_rows, self.color_format)
+        if self.color_format != framebuf.RGB565:
+            self.line_mv = memoryview(bytearray(self.width * 2))
+        self.dirty = []
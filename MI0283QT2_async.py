@@ -0,0 +1,77 @@
+"""
+asyncio support of the MI0283QT2 drivers. Touch events are read with the async iterator given by touch_events()
+of the drivers, the LVGL driver runs LVGL in the task run():
+
+    async def buttons(disp):
+        async for event, x, y in disp.touch_events():
+            if event == TOUCH_PRESS:
+                print("pressed", x, y)
+
+    asyncio.create_task(buttons(disp))
+
+asyncio is imported from here by the drivers, older MicroPython versions only have uasyncio.
+"""
+from micropython import const
+import time
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
+
+#Touch events given by TouchEvents
+TOUCH_PRESS = const(0)
+TOUCH_MOVE = const(1)
+TOUCH_RELEASE = const(2)
+
+class TouchEvents(object):
+    """
+    Async iterator of touch events (event, x, y) of a driver, created by touch_events() of the drivers.
+    The touch screen is read every period ms while it is pressed and the task sleeps in between. With the pen
+    interrupt the task sleeps while the screen isn't pressed until the interrupt wakes it, without it the screen
+    is polled every period ms. A release gives the last pressed point. Reads are skipped while the flush thread
+    of the LVGL driver is sending, so the event loop never waits for the bus. close() stops the interrupt wake ups
+    """
+    def __init__(self, display, period=20):
+        self.display = display
+        self.period = period
+        self.last = None #last pressed point, None while released
+        self.read_ms = time.ticks_add(time.ticks_ms(), -period)
+        self.flag = None
+        if display.touch_irq != None and display.touch_cs != None:
+            self.flag = asyncio.ThreadSafeFlag()
+            display.touch_flags.append(self.flag)
+
+    def close(self):
+        if self.flag != None:
+            self.display.touch_flags.remove(self.flag)
+            self.flag = None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        display = self.display
+        while True:
+            if self.flag != None and self.last == None and display.touch_idle():
+                #The flag can be left set by an earlier interrupt, then the idle check only runs once more
+                await self.flag.wait()
+                continue
+            wait = self.period - time.ticks_diff(time.ticks_ms(), self.read_ms)
+            if wait > 0:
+                await asyncio.sleep_ms(wait)
+            self.read_ms = time.ticks_ms()
+            if display.bus_lock != None and display.bus_lock.locked():
+                continue
+
+            point = display.touch_read()
+            if(point[0] == -1 and point[1] == -1):
+                if self.last != None:
+                    last = self.last
+                    self.last = None
+                    return (TOUCH_RELEASE, last[0], last[1])
+            elif self.last == None:
+                self.last = point
+                return (TOUCH_PRESS, point[0], point[1])
+            elif point != self.last:
+                self.last = point
+                return (TOUCH_MOVE, point[0], point[1])
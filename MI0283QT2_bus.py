@@ -0,0 +1,51 @@
+class SPIBus(object):
+    """
+    Owner of the SPI peripheral shared by the display and the touch screen controller
+
+    Every device on the bus is added with its chip select pin and SPI speed. Before a transfer the device
+    calls acquire(), which reconfigures the peripheral with spi.init() only when the bus changes owner.
+    Consecutive transfers of the same device cost a single comparison.
+
+    One bus can be shared by several drivers, pass it to the driver constructors with bus=
+
+    An already created SPI object can be given with spi=, then the other pin arguments are not used.
+    Any object with the machine.SPI interface works, for example the simulated bus of MI0283QT2_sim
+    """
+
+    #MOSI is SDI, MISO is SDO
+    def __init__(self, spi_id, sck, mosi, miso, baudrate, spi=None):
+        if spi == None:
+            from machine import SPI
+            spi = SPI(spi_id, baudrate=baudrate,
+                      sck = sck,
+                      mosi = mosi,
+                      miso = miso)
+        else:
+            spi.init(baudrate=baudrate)
+        self.spi = spi
+        self.baudrate = baudrate
+
+        self.devices = [] #[cs, baudrate] for every device
+        self.owner = -1 #index of the device that used the bus last
+
+    def add_device(self, cs, baudrate):
+        """
+        Adds a device with chip select pin cs and returns its id used for acquire()
+        """
+        self.devices.append([cs, baudrate])
+        return len(self.devices) - 1
+
+    def acquire(self, device):
+        """
+        Makes device the owner of the bus and returns the SPI object configured for it
+        """
+        if self.owner != device:
+            if self.owner != -1:
+                #chip select of the previous owner must not stay enabled
+                self.devices[self.owner][0](1)
+            baudrate = self.devices[device][1]
+            if baudrate != self.baudrate:
+                self.spi.init(baudrate=baudrate)
+                self.baudrate = baudrate
+            self.owner = device
+        return self.spi
@@ -0,0 +1,87 @@
+from micropython import const
+import framebuf
+
+#Size of a character of the framebuf font
+_CHAR_WIDTH = const(8)
+_CHAR_HEIGHT = const(8)
+
+class Console(object):
+    """
+    Scrolling text console in a vertical scroll area of the screen (orientation 0 or 180). Every new line is
+    drawn into a one line framebuffer and sent to the line of the scroll area that scrolled out, then the
+    scroll offset is moved by one line. Adding a line costs one line of pixels instead of a whole frame.
+
+        console = Console(disp, top=20)
+        console.print("temperature", 21.5)
+
+    top, height - rows of the screen used by the console, the rest of the screen stays in place
+    line_spacing - empty rows between lines of text
+    font, scale - MI0283QT2_font.Font used instead of the 8x8 framebuf font and its scale
+    """
+    def __init__(self, display, top=0, height=None, color_rgb565=0xFFFF, background_rgb565=0x0000, line_spacing=2,
+                 font=None, scale=1):
+        self.display = display
+        self.font = font
+        self.scale = scale
+        if height == None:
+            height = display.height - top
+        if font != None:
+            char_width = font.max_width * scale
+            char_height = font.height * scale
+        else:
+            char_width = _CHAR_WIDTH
+            char_height = _CHAR_HEIGHT
+        self.line_height = char_height + line_spacing
+        self.lines = height // self.line_height
+        if self.lines < 1:
+            raise ValueError("Console has to be at least one line high")
+        self.top = top
+        self.height = self.lines * self.line_height
+        #With a proportional font lines are broken after as many of its widest characters as fit
+        self.columns = display.width // char_width
+        self.text_y = line_spacing // 2
+
+        #framebuf keeps RGB565 pixels little endian, colors are swapped so the buffer is in byte order of the display
+        self.color = ((color_rgb565 & 0xFF) << 8) | (color_rgb565 >> 8)
+        self.background = ((background_rgb565 & 0xFF) << 8) | (background_rgb565 >> 8)
+        self.background_rgb565 = background_rgb565
+        self.line_buf = bytearray(display.width * self.line_height * 2)
+        self.line_fbuf = framebuf.FrameBuffer(self.line_buf, display.width, self.line_height, framebuf.RGB565)
+        self.clear()
+
+    def clear(self):
+        self.display.set_scroll_area(self.top, self.height)
+        self.display.fill_rect(0, self.top, self.display.width, self.height, self.background_rgb565)
+        self.count = 0 #lines written since clear()
+        self.first = 0 #line of the scroll area shown at its top
+
+    def print(self, *args):
+        """
+        Adds text to the console like print(), text longer than a line continues on the next one
+        """
+        text = " ".join([str(arg) for arg in args])
+        for line in text.split("\n"):
+            self.add_line(line[:self.columns])
+            line = line[self.columns:]
+            while line:
+                self.add_line(line[:self.columns])
+                line = line[self.columns:]
+
+    def add_line(self, text):
+        if self.count < self.lines:
+            line = self.count
+            self.count += 1
+        else:
+            #Oldest line is overwritten and scrolled to the bottom
+            line = self.first
+            self.first = (self.first + 1) % self.lines
+            self.display.scroll(self.first * self.line_height)
+
+        fbuf = self.line_fbuf
+        fbuf.fill(self.background)
+        if self.font != None:
+            self.font.text(fbuf, text, 0, self.text_y, self.color, None, framebuf.RGB565, self.scale)
+        else:
+            fbuf.text(text, 0, self.text_y, self.color)
+        self.display.draw_stream(0, self.top + line * self.line_height, self.display.width, self.line_height,
+                                 (self.line_buf,))
@@ -0,0 +1,856 @@
+from micropython import const
+import time
+from MI0283QT2_bus import SPIBus
+
+#Command set registers
+_POWER_CONTROL_INTERNAL_USE_1 = const(0xEA)
+_POWER_CONTROL_INTERNAL_USE_2 = const(0xEB)
+_SOURCE_CONTROL_INTERNAL_USE_1 = const(0xEC)
+_SOURCE_CONTROL_INTERNAL_USE_2 = const(0xED)
+_SOURCE_OP_CONTROL_NORMAL = const(0xE8)
+_SOURCE_OP_CONTROL_IDLE = const(0xE9)
+_DISPLAY_CONTROL_2 = const(0x27)
+_POWER_CONTROL_2 = const(0x1B)
+_POWER_CONTROL_1 = const(0x1A)
+_VCOM_CONTROL_1 = const(0x23)
+_VCOM_CONTROL_2 = const(0x24)
+_VCOM_CONTROL_3 = const(0x25)
+_OSC_CONTROL_2 = const(0x18)
+_OSC_CONTROL_1 = const(0x19)
+_DISPLAY_MODE_CONTROL = const(0x01)
+_POWER_CONTROL_6 = const(0x1F)
+_COLMOD = const(0x17)
+_PANEL_CHARACTERISTIC = const(0x36)
+_MEMORY_ACCESS_CONTROL = const(0x16)
+_COLUMN_ADDRESS_START_1 = const(0x03)
+_COLUMN_ADDRESS_START_2 = const(0x02)
+_COLUMN_ADDRESS_END_1 = const(0x05)
+_COLUMN_ADDRESS_END_2 = const(0x04)
+_ROW_ADDRESS_START_1 = const(0x07)
+_ROW_ADDRESS_START_2 = const(0x06)
+_ROW_ADDRESS_END_1 = const(0x09)
+_ROW_ADDRESS_END_2 = const(0x08)
+_DISPLAY_CONTROL_3 = const(0x28)
+_TOP_FIXED_AREA_1 = const(0x0F)
+_TOP_FIXED_AREA_2 = const(0x0E)
+_SCROLL_AREA_1 = const(0x11)
+_SCROLL_AREA_2 = const(0x10)
+_BOTTOM_FIXED_AREA_1 = const(0x13)
+_BOTTOM_FIXED_AREA_2 = const(0x12)
+_SCROLL_START_1 = const(0x15)
+_SCROLL_START_2 = const(0x14)
+
+#Bit of DISPLAY_MODE_CONTROL that turns vertical scrolling on
+_SCROLL_ON = const(0x08)
+
+#LCD commands
+_LCD_ID = const(0)
+_LCD_DATA = const((0x72)|(_LCD_ID<<2))
+_LCD_REGISTER = const((0x70)|(_LCD_ID<<2))
+
+#Touch commands
+_ADS_CMD_START = const(0x80)
+_ADS_CMD_12BIT = const(0x00)
+_ADS_CMD_8BIT = const(0x08)
+_ADS_CMD_DIFF = const(0x00)
+_ADS_CMD_X_POS = const(0x50)
+_ADS_CMD_Y_POS = const(0x10)
+_ADS_CMD_Z1_POS = const(0x30)
+_ADS_CMD_Z2_POS = const(0x40)
+_ADS_CMD_ALWAYS_ON = const(0x02)
+_ADS_CMD_POWER_OFF = const(0x00)
+
+#Minimal pressure for touch detection
+_MIN_PRESSURE = const(32) #12 bit pressure, value range from 1 to 8190
+
+#Touch filter defaults, see set_touch_filter()
+_TOUCH_SAMPLES = const(5)
+_TOUCH_MAX_SPREAD = const(60)
+
+#Touch offset, default calibration is made from it
+_X_MIN = const(170)
+_X_MAX = const(3815)
+_Y_MIN = const(286)
+_Y_MAX = const(3839)
+
+#Fraction bits of the fixed point touch matrix
+_CAL_SHIFT = const(16)
+#Half size of the calibration cross in pixels
+_CAL_CROSS_SIZE = const(10)
+#Minimal number of readings of one calibration point
+_CAL_MIN_SAMPLES = const(5)
+
+_DISPLAY_SPI_SPEED = const(24000000) 
+_TOUCH_SPI_SPEED = const(1000000)
+
+#Default screen size values
+_LCD_WIDTH = const(320)
+_LCD_HEIGHT = const(240)
+
+#Screen coordinates in every orientation from coordinates in orientation 0 (px, py),
+#(sxx, sxy, tx, syx, syy, ty) for x = sxx*px + sxy*py + tx and y = syx*px + syy*py + ty
+_TOUCH_ORIENTATION = {
+    0: (1, 0, 0, 0, 1, 0),
+    90: (0, -1, _LCD_WIDTH - 1, 1, 0, 0),
+    180: (-1, 0, _LCD_HEIGHT - 1, 0, -1, _LCD_WIDTH - 1),
+    270: (0, 1, 0, -1, 0, _LCD_HEIGHT - 1)}
+
+#Size of the buffer with repeated color used by the drawing primitives, in bytes
+_FILL_BUF_SIZE = const(1280)
+
+class MI0283QT2_core(object):
+    """
+    Common part of the MI0283QT2 drivers, HX8347-D display controller and XPT2046 touch screen controller
+    on one SPI bus: controller setup, register writes, windowed drawing, drawing primitives, touch reading,
+    filtering and calibration. MI0283QT2 (framebuf) and MI0283QT2_lvgl are built on it.
+
+    For orientation related information and more information about the display controller consult the HX8347-D datasheet
+    For more information about the touch screen controller consult the XPT2046 / ADS7846 datasheet
+
+    Register and command values are module level const() with underscore names, the compiler replaces
+    them with their values so they take no RAM and need no lookups.
+
+    enable_stats() turns on counting of bus traffic and timing of register writes, window changes, flushes and
+    touch readings, stats() returns the results
+    """
+
+    #Methods measured by enable_stats(), (name in stats(), method)
+    STATS_METHODS = (("command", "wr_reg"), ("set_area", "set_area"), ("touch", "touch_sample"))
+
+    #MOSI is SDI, MISO is SDO
+    def __init__(self, spi_id, sck, mosi, miso, rst, led, display_cs, touch_cs=None, orientation=0, bus=None,
+                 touch_irq=None):
+         
+        # Pin setup, pins only need the machine.Pin interface, so simulated pins can be used (see MI0283QT2_sim)
+        self.rst = rst
+        self.rst.init(mode = rst.OUT)
+        self.rst_enable()
+        
+        self.led = led
+        self.led.init(mode = led.OUT)
+        self.led_disable()
+        
+        self.display_cs = display_cs
+        self.display_cs.init(mode = display_cs.OUT)
+        self.display_cs_disable()
+        
+        self.touch_cs = touch_cs
+        if touch_cs != None:
+            self.touch_cs.init(mode = touch_cs.OUT)
+            self.touch_cs_disable()
+        
+        # SPI setup, the bus is shared with the touch screen controller and can be shared with other drivers
+        self.spi_id = spi_id
+        self.sck = sck
+        self.mosi = mosi
+        self.miso = miso
+        if bus == None:
+            bus = SPIBus(spi_id, sck, mosi, miso, _DISPLAY_SPI_SPEED)
+        self.bus = bus
+        self.spi = bus.spi
+        self.display_dev = bus.add_device(display_cs, _DISPLAY_SPI_SPEED)
+        if touch_cs != None:
+            self.touch_dev = bus.add_device(touch_cs, _TOUCH_SPI_SPEED)
+        
+        print(self.spi)
+
+        #Shadow of the values written to controller registers, -1 when the value is unknown
+        self.reg_shadow = [-1] * 256
+
+        #Preallocated buffers for the command path, so sending commands doesn't allocate memory
+        self.byte_buf = bytearray(1)
+        self.reg_buf = bytearray((_LCD_REGISTER, 0))
+        self.data_buf = bytearray((_LCD_DATA, 0))
+        self.gram_buf = bytearray((_LCD_REGISTER, 0x22)) #register index of GRAM write
+        self.data_prefix = bytearray((_LCD_DATA,))
+        self.rd_buf1 = bytearray(1)
+        self.rd_buf2 = bytearray(2)
+
+        #Buffer of repeated color for the drawing primitives
+        self.fill_buf = bytearray(_FILL_BUF_SIZE)
+        self.fill_mv = memoryview(self.fill_buf)
+        self.fill_color = 0
+
+        self.scroll_height = 0 #0 while vertical scrolling is off
+
+        self.stats_data = None #see enable_stats()
+        self.bus_lock = None #lock of the bus when another thread sends to the display
+
+        #Pen interrupt of the touch screen controller, with it the controller is read only while touched
+        self.touch_irq = touch_irq
+        self.touch_pending = False
+        self.touch_flags = [] #asyncio.ThreadSafeFlag objects of waiting tasks, set by the pen interrupt
+        if touch_irq != None and touch_cs != None:
+            self.touch_irq.init(mode = touch_irq.IN, pull = touch_irq.PULL_UP)
+            self.touch_irq.irq(handler = self.touch_irq_handler, trigger = touch_irq.IRQ_FALLING)
+            self.touch_arm_irq()
+
+        self.set_touch_filter()
+        self.touch_cal = ((_LCD_HEIGHT - 1) / (_X_MAX - _X_MIN), 0, -_X_MIN * (_LCD_HEIGHT - 1) / (_X_MAX - _X_MIN),
+                          0, (_LCD_WIDTH - 1) / (_Y_MAX - _Y_MIN), -_Y_MIN * (_LCD_WIDTH - 1) / (_Y_MAX - _Y_MIN))
+        
+        self.reset()
+        
+        self.width = _LCD_WIDTH
+        self.height = _LCD_HEIGHT
+        self.orientation = orientation
+        self.setOrientation(self.orientation)
+        
+        self.led_enable()
+                
+    """
+        Helper functions for pin setup
+    """
+    def led_enable(self):
+        self.led.high()
+    
+    def led_disable(self):
+        self.led.low()
+        
+    def rst_enable(self):
+        self.rst.low()
+        
+    def rst_disable(self):
+        self.rst.high()
+        
+    def display_cs_enable(self):
+        self.display_cs.low()
+        
+    def display_cs_disable(self):
+        self.display_cs.high()
+    
+    def touch_cs_enable(self):
+        self.touch_cs.low()
+        
+    def touch_cs_disable(self):
+        self.touch_cs.high()
+        
+
+    def set_area(self, x0, y0, x1, y1):
+        #Only changed bytes reach the controller (see wr_cmd), GRAM writes always start at (x0, y0)
+        self.wr_cmd(_COLUMN_ADDRESS_START_1, (x0>>0 & 0xFF)) 
+        self.wr_cmd(_COLUMN_ADDRESS_START_2, (x0>>8 & 0xFF))
+        self.wr_cmd(_COLUMN_ADDRESS_END_1, (x1>>0 & 0xFF)) 
+        self.wr_cmd(_COLUMN_ADDRESS_END_2, (x1>>8 & 0xFF))
+        self.wr_cmd(_ROW_ADDRESS_START_1, (y0>>0 & 0xFF)) 
+        self.wr_cmd(_ROW_ADDRESS_START_2, (y0>>8 & 0xFF)) 
+        self.wr_cmd(_ROW_ADDRESS_END_1, (y1>>0 & 0xFF)) 
+        self.wr_cmd(_ROW_ADDRESS_END_2, (y1>>8 & 0xFF)) 
+
+    def draw_start(self):
+        if self.bus.owner != self.display_dev:
+            self.bus.acquire(self.display_dev)
+        #Pins are toggled by calling them directly, it is faster than the helper functions
+        cs = self.display_cs
+        cs(0)
+        self.spi.write(self.gram_buf)
+        cs(1)
+        
+        cs(0)
+        self.spi.write(self.data_prefix)
+    
+    def draw_stop(self):
+        self.display_cs_disable()
+
+    """
+        Drawing primitives, they draw directly on the screen and don't use a framebuffer.
+        Colors are RGB565 values
+    """
+    def fill(self, color_rgb565):
+        self.fill_rect(0, 0, self.width, self.height, color_rgb565)
+
+    def fill_rect(self, x, y, w, h, color_rgb565):
+        """
+        Fills a rectangle with a color. The window is set once and the buffer of repeated color is
+        streamed into it chunk by chunk
+        """
+        x0 = max(x, 0)
+        y0 = max(y, 0)
+        x1 = min(x + w, self.width) - 1
+        y1 = min(y + h, self.height) - 1
+        if(x0 > x1 or y0 > y1):
+            return
+
+        self.set_fill_color(color_rgb565)
+        self.set_area(x0, y0, x1, y1)
+        self.draw_start()
+
+        remaining = (x1 - x0 + 1) * (y1 - y0 + 1) * 2
+        while remaining >= _FILL_BUF_SIZE:
+            self.wr_buf_spi(self.fill_buf)
+            remaining -= _FILL_BUF_SIZE
+        if remaining:
+            self.wr_buf_spi(self.fill_mv[:remaining])
+
+        self.draw_stop()
+
+    def draw_stream(self, x, y, w, h, rows):
+        """
+        Draws an image directly on the screen while it is being read, so it doesn't need a framebuffer.
+        The window is set once and the rows are sent into it as they come.
+        rows - iterable of buffers, every buffer holds one or more whole rows of w RGB565 pixels in byte order
+               of the display (big endian). Buffers can be reused, rows after the h-th aren't read.
+        Parts outside of the screen are clipped. See MI0283QT2_image for BMP and raw image readers
+        """
+        x0 = max(x, 0)
+        y0 = max(y, 0)
+        x1 = min(x + w, self.width) - 1
+        y1 = min(y + h, self.height) - 1
+        if(x0 > x1 or y0 > y1):
+            return
+
+        row_size = w * 2
+        #Visible part of a row
+        start = (x0 - x) * 2
+        end = (x1 - x + 1) * 2
+
+        self.set_area(x0, y0, x1, y1)
+        self.draw_start()
+        row = y
+        for buf in rows:
+            n = len(buf) // row_size
+            if(start == 0 and end == row_size and row >= y0 and row + n - 1 <= y1 and len(buf) == n * row_size):
+                #whole buffer is visible
+                self.wr_buf_spi(buf)
+            else:
+                mv = memoryview(buf)
+                pos = 0
+                for i in range(n):
+                    if(row + i >= y0 and row + i <= y1):
+                        self.wr_buf_spi(mv[pos + start:pos + end])
+                    pos += row_size
+            row += n
+            if(row > y1):
+                break
+        self.draw_stop()
+
+    def hline(self, x, y, w, color_rgb565):
+        self.fill_rect(x, y, w, 1, color_rgb565)
+
+    def vline(self, x, y, h, color_rgb565):
+        self.fill_rect(x, y, 1, h, color_rgb565)
+
+    def rect(self, x, y, w, h, color_rgb565):
+        self.hline(x, y, w, color_rgb565)
+        self.hline(x, y + h - 1, w, color_rgb565)
+        self.vline(x, y + 1, h - 2, color_rgb565)
+        self.vline(x + w - 1, y + 1, h - 2, color_rgb565)
+
+    def set_fill_color(self, color_rgb565):
+        """
+        Fills the buffer used by the drawing primitives with a color, in byte order of the display
+        """
+        if self.fill_color == color_rgb565:
+            return
+        mv = self.fill_mv
+        mv[0] = color_rgb565 >> 8
+        mv[1] = color_rgb565 & 0xFF
+        #color is copied in doubling blocks instead of pixel by pixel
+        n = 2
+        while n < _FILL_BUF_SIZE:
+            m = min(n, _FILL_BUF_SIZE - n)
+            mv[n:n + m] = mv[0:m]
+            n += m
+        self.fill_color = color_rgb565
+    
+    def touch_read(self):
+        """
+        Return reading coordinates in the form of a (x, y) touple. If the touch screen is not 
+        pressed the result will be (-1, -1)
+        """
+        if self.touch_cs == None:
+            return (-1, -1)
+        if self.touch_idle():
+            #Release seen by the pen interrupt, the next press mustn't fall back to the old point
+            self.last_point = None
+            return (-1, -1)
+        return self.touch_sample()
+
+    def touch_sample(self):
+        """
+        Reads the touch screen controller, the caller has to make sure the SPI bus is free
+        """
+        #Touch screen controller doesn't support the display SPI speed, the bus switches speed only
+        #when its owner changes, the display takes it back on its next transfer
+        self.bus.acquire(self.touch_dev)
+        pressure = self.touch_read_raw()
+
+        x = -1
+        y = -1
+        if(pressure >= self.touch_min_pressure):
+            x_raw = self.filter_samples(self.touch_xs)
+            y_raw = self.filter_samples(self.touch_ys)
+            if(x_raw >= 0 and y_raw >= 0):
+                m = self.touch_matrix
+                x = min(max((m[0] * x_raw + m[1] * y_raw + m[2]) >> _CAL_SHIFT, 0), self.width - 1)
+                y = min(max((m[3] * x_raw + m[4] * y_raw + m[5]) >> _CAL_SHIFT, 0), self.height - 1)
+            elif self.last_point != None:
+                #Samples disagree, the screen is still pressed so the last point is kept
+                x, y = self.last_point
+
+        #The sequence ends in power down mode, so the pen interrupt is armed again
+        self.touch_pending = False
+
+        if(x == -1):
+            self.last_point = None
+            return (-1, -1)
+
+        last = self.last_point
+        if(last != None and abs(x - last[0]) <= self.touch_hysteresis and abs(y - last[1]) <= self.touch_hysteresis):
+            #Movements within hysteresis are treated as jitter
+            return last
+        self.last_point = (x, y)
+        return self.last_point
+
+    def touch_read_raw(self):
+        """
+        Runs the whole measurement sequence (Z1, Z2, X samples, Y samples) in one transfer, returns 12 bit
+        pressure and if the screen is pressed fills touch_xs and touch_ys with raw samples
+        """
+        rx = self.touch_rx
+        self.touch_cs_enable()
+        self.spi.write_readinto(self.touch_tx, rx)
+        self.touch_cs_disable()
+
+        #Result of conversion i is in bits [14:3] of bytes 2*i+1 and 2*i+2, consult datasheet for more info
+        pressure = (((rx[1] << 8) | rx[2]) >> 3) + 4095 - (((rx[3] << 8) | rx[4]) >> 3)
+        if(pressure >= self.touch_min_pressure):
+            pos = 5
+            xs = self.touch_xs
+            for i in range(len(xs)):
+                xs[i] = ((rx[pos] << 8) | rx[pos + 1]) >> 3
+                pos += 2
+            ys = self.touch_ys
+            for i in range(len(ys)):
+                ys[i] = ((rx[pos] << 8) | rx[pos + 1]) >> 3
+                pos += 2
+        return pressure
+
+    def build_touch_sequence(self, samples):
+        """
+        Prepares command and response buffers of the measurement sequence. Conversions take 16 clocks and
+        the next command is sent while the low byte of the previous result is received, so one conversion
+        takes two bytes. With pen interrupt the last command powers the controller down to enable it again
+        """
+        commands = [_ADS_CMD_START | _ADS_CMD_12BIT | _ADS_CMD_DIFF | _ADS_CMD_Z1_POS | _ADS_CMD_ALWAYS_ON,
+                    _ADS_CMD_START | _ADS_CMD_12BIT | _ADS_CMD_DIFF | _ADS_CMD_Z2_POS | _ADS_CMD_ALWAYS_ON]
+        commands += [_ADS_CMD_START | _ADS_CMD_12BIT | _ADS_CMD_DIFF | _ADS_CMD_X_POS | _ADS_CMD_ALWAYS_ON] * samples
+        commands += [_ADS_CMD_START | _ADS_CMD_12BIT | _ADS_CMD_DIFF | _ADS_CMD_Y_POS | _ADS_CMD_ALWAYS_ON] * samples
+        if self.touch_irq != None:
+            commands[-1] = _ADS_CMD_START | _ADS_CMD_12BIT | _ADS_CMD_DIFF | _ADS_CMD_Y_POS | _ADS_CMD_POWER_OFF
+
+        self.touch_tx = bytearray(2 * len(commands) + 1)
+        self.touch_rx = bytearray(len(self.touch_tx))
+        for i in range(len(commands)):
+            self.touch_tx[2 * i] = commands[i]
+
+    def set_touch_filter(self, samples=_TOUCH_SAMPLES, method="median", max_spread=_TOUCH_MAX_SPREAD,
+                         min_pressure=_MIN_PRESSURE, hysteresis=0):
+        """
+        Configures filtering of touch readings
+        samples - number of X and Y samples taken for one reading
+        method - "median" of the samples or "mean" of the samples that agree with the median
+        max_spread - samples further than max_spread (raw 12 bit units) from the median are discarded, the
+                     whole reading is discarded if that leaves half of the samples or less
+        min_pressure - minimal 12 bit pressure (Z1 + 4095 - Z2) for touch detection
+        hysteresis - new point within hysteresis pixels of the last one is reported as the last one
+        """
+        if samples < 1:
+            raise ValueError("At least one touch sample is needed")
+        if method != "median" and method != "mean":
+            raise ValueError("Touch filter method can only be median or mean")
+        self.build_touch_sequence(samples)
+        self.touch_xs = [0] * samples
+        self.touch_ys = [0] * samples
+        self.touch_mean = method == "mean"
+        self.touch_max_spread = max_spread
+        self.touch_min_pressure = min_pressure
+        self.touch_hysteresis = hysteresis
+        self.last_point = None
+
+    def filter_samples(self, samples):
+        """
+        Returns filtered value of raw samples, or -1 if too many of them disagree
+        """
+        samples.sort()
+        n = len(samples)
+        median = samples[n // 2]
+        total = 0
+        count = 0
+        for s in samples:
+            if(abs(s - median) <= self.touch_max_spread):
+                total += s
+                count += 1
+        if(count * 2 <= n):
+            return -1
+        if self.touch_mean:
+            return total // count
+        return median
+
+    def set_calibration(self, calibration):
+        """
+        Sets touch calibration, six numbers (a, b, c, d, e, f) mapping raw readings to screen coordinates
+        in orientation 0: x = a*x_raw + b*y_raw + c, y = d*x_raw + e*y_raw + f.
+        Fixed point matrix for the current orientation is precomputed from it
+        """
+        if len(calibration) != 6:
+            raise ValueError("Calibration consists of six numbers")
+        self.touch_cal = tuple(calibration)
+        self.update_touch_matrix()
+
+    def get_calibration(self):
+        return self.touch_cal
+
+    def save_calibration(self, path):
+        with open(path, "w") as f:
+            f.write(",".join([str(v) for v in self.touch_cal]))
+
+    def load_calibration(self, path):
+        """
+        Loads calibration saved by save_calibration(), returns False if the file doesn't exist
+        """
+        try:
+            with open(path) as f:
+                calibration = [float(v) for v in f.read().split(",")]
+        except OSError:
+            return False
+        self.set_calibration(calibration)
+        return True
+
+    def update_touch_matrix(self):
+        """
+        Combines calibration with the orientation into one fixed point matrix, so mapping a touch
+        reading needs only integer multiplies and adds
+        """
+        a, b, c, d, e, f = self.touch_cal
+        sxx, sxy, tx, syx, syy, ty = _TOUCH_ORIENTATION[self.orientation]
+        scale = 1 << _CAL_SHIFT
+        half = 1 << (_CAL_SHIFT - 1) #for rounding
+        self.touch_matrix = [
+            int((sxx * a + sxy * d) * scale),
+            int((sxx * b + sxy * e) * scale),
+            int((sxx * c + sxy * f + tx) * scale) + half,
+            int((syx * a + syy * d) * scale),
+            int((syx * b + syy * e) * scale),
+            int((syx * c + syy * f + ty) * scale) + half]
+
+    def calibrate(self, points=None, color_rgb565=0xFFFF, background_rgb565=0x0000):
+        """
+        Runs 3 point touch calibration. A cross is drawn directly on the screen at every point and the
+        function blocks until it is touched and released. The screen content is overwritten.
+        points - three (x, y) points in the current orientation, by default spread over the screen
+        Returns the new calibration, it can be saved with save_calibration()
+        """
+        if points == None:
+            w = self.width
+            h = self.height
+            points = ((w // 10, h // 10), (w - 1 - w // 10, h // 2), (w // 2, h - 1 - h // 10))
+
+        raw = []
+        for p in points:
+            self.fill(background_rgb565)
+            self.hline(p[0] - _CAL_CROSS_SIZE, p[1], 2 * _CAL_CROSS_SIZE + 1, color_rgb565)
+            self.vline(p[0], p[1] - _CAL_CROSS_SIZE, 2 * _CAL_CROSS_SIZE + 1, color_rgb565)
+            raw.append(self.calibration_sample())
+        self.fill(background_rgb565)
+
+        #Points are converted to orientation 0, the orientation transformation is its own inverse transposed
+        sxx, sxy, tx, syx, syy, ty = _TOUCH_ORIENTATION[self.orientation]
+        xs = [sxx * (p[0] - tx) + syx * (p[1] - ty) for p in points]
+        ys = [sxy * (p[0] - tx) + syy * (p[1] - ty) for p in points]
+
+        (x0, y0), (x1, y1), (x2, y2) = raw
+        det = x0 * (y1 - y2) + x1 * (y2 - y0) + x2 * (y0 - y1)
+        if det == 0:
+            raise ValueError("Calibration points can't be on a line")
+        calibration = []
+        for t0, t1, t2 in (xs, ys):
+            #Cramer's rule for a*x_raw + b*y_raw + c = t
+            calibration.append((t0 * (y1 - y2) + t1 * (y2 - y0) + t2 * (y0 - y1)) / det)
+            calibration.append((x0 * (t1 - t2) + x1 * (t2 - t0) + x2 * (t0 - t1)) / det)
+            calibration.append((x0 * (y1 * t2 - y2 * t1) + x1 * (y2 * t0 - y0 * t2) + x2 * (y0 * t1 - y1 * t0)) / det)
+        self.set_calibration(calibration)
+        return self.touch_cal
+
+    def calibration_sample(self):
+        """
+        Waits for a touch and returns average raw (x, y) reading of it after the screen is released
+        """
+        x_total = 0
+        y_total = 0
+        count = 0
+        while True:
+            self.bus.acquire(self.touch_dev)
+            if(self.touch_read_raw() >= self.touch_min_pressure):
+                x_raw = self.filter_samples(self.touch_xs)
+                y_raw = self.filter_samples(self.touch_ys)
+                if(x_raw >= 0 and y_raw >= 0):
+                    x_total += x_raw
+                    y_total += y_raw
+                    count += 1
+            elif(count >= _CAL_MIN_SAMPLES):
+                return (x_total / count, y_total / count)
+            time.sleep_ms(10)
+
+    def touch_irq_handler(self, pin):
+        self.touch_pending = True
+        for flag in self.touch_flags:
+            flag.set()
+
+    def touch_idle(self):
+        """
+        Returns True when the pen interrupt shows the touch screen isn't pressed, so reading it can be skipped
+        """
+        return self.touch_irq != None and not self.touch_pending and self.touch_irq.value() == 1
+
+    def touch_arm_irq(self):
+        """
+        Puts the touch screen controller in power down mode, which enables its pen interrupt
+        """
+        self.bus.acquire(self.touch_dev)
+        self.touch_cs_enable()
+        self.wr_spi(_ADS_CMD_START | _ADS_CMD_12BIT | _ADS_CMD_DIFF | _ADS_CMD_X_POS | _ADS_CMD_POWER_OFF)
+        self.rd_spi(2)
+        self.touch_cs_disable()
+        #Cleared after the command, switching modes can trigger the interrupt
+        self.touch_pending = False
+    
+    def enable_stats(self, enable=True):
+        """
+        Turns bus statistics on or off. While they are on, the SPI object and chip select pins are replaced with
+        counting proxies and the methods in STATS_METHODS with timing wrappers, while they are off the driver
+        runs without them. Call it while nothing is being drawn
+        """
+        if enable and self.stats_data == None:
+            from MI0283QT2_stats import Stats
+            stats = Stats(self)
+            self.spi = stats.spi
+            self.display_cs = stats.display_cs
+            if stats.touch_cs != None:
+                self.touch_cs = stats.touch_cs
+            for key, name in self.STATS_METHODS:
+                stats.wrap(self, key, name)
+            stats.count_pixels(self)
+            self.stats_data = stats
+        elif not enable and self.stats_data != None:
+            stats = self.stats_data
+            for key, name in self.STATS_METHODS:
+                delattr(self, name)
+            delattr(self, "wr_buf_spi")
+            self.spi = stats.spi.spi
+            self.display_cs = stats.display_cs.pin
+            if stats.touch_cs != None:
+                self.touch_cs = stats.touch_cs.pin
+            self.stats_data = None
+
+    def stats(self):
+        """
+        Returns statistics since enable_stats() or reset_stats() as a dict, None if they are off.
+        transfers and bytes count SPI transfers and sent bytes, pixel_bytes and command_bytes split the bytes sent
+        to the display into pixel data and everything else (register writes, prefixes), display_cs and touch_cs
+        count chip select assertions. Measured methods have (calls, time in us), time of a method includes the
+        methods it calls:
+        command - register writes sent to the controller, writes skipped by the register shadow aren't counted
+        set_area - window changes
+        touch - touch screen readings
+        flush - transfers of screen areas
+        """
+        if self.stats_data == None:
+            return None
+        return self.stats_data.result()
+
+    def reset_stats(self):
+        if self.stats_data != None:
+            self.stats_data.reset()
+
+    def touch_events(self, period=20):
+        """
+        Returns an async iterator of touch events (event, x, y) for asyncio, see MI0283QT2_async.TouchEvents
+        """
+        from MI0283QT2_async import TouchEvents
+        return TouchEvents(self, period)
+
+    def setOrientation(self, orientation):
+        if(orientation == 0):
+            self.wr_cmd(_MEMORY_ACCESS_CONTROL, 0x08) 
+            self.width = _LCD_HEIGHT
+            self.height = _LCD_WIDTH
+        elif(orientation == 90):
+            self.wr_cmd(_MEMORY_ACCESS_CONTROL, 0xA8) 
+            self.width = _LCD_WIDTH
+            self.height = _LCD_HEIGHT
+        elif(orientation == 180):
+            self.wr_cmd(_MEMORY_ACCESS_CONTROL, 0xC8) 
+            self.width = _LCD_HEIGHT
+            self.height = _LCD_WIDTH
+        elif(orientation == 270):
+            self.wr_cmd(_MEMORY_ACCESS_CONTROL, 0x68) 
+            self.width = _LCD_WIDTH
+            self.height = _LCD_HEIGHT
+        else:
+            raise ValueError("Orientation can only be 0, 90, 180 and 270")
+        self.orientation = orientation
+        self.update_touch_matrix()
+        if self.scroll_height:
+            self.scroll_off()
+
+    """
+        Vertical scrolling, the panel scrolls along its long side, so it is possible in orientation 0 and 180.
+        Scrolling changes only which part of the display memory is shown, drawing still uses memory
+        coordinates, inside the scroll area a row drawn at y is shown scroll offset rows higher
+    """
+    def set_scroll_area(self, top, height):
+        """
+        Turns vertical scrolling on with offset 0, rows from top to top + height - 1 scroll and the rows
+        above and below them stay in place
+        """
+        if(self.orientation != 0 and self.orientation != 180):
+            raise ValueError("Vertical scrolling is only possible in orientation 0 and 180")
+        if(top < 0 or height < 1 or top + height > self.height):
+            raise ValueError("Scroll area has to be on the screen")
+        bottom = self.height - top - height
+        if(self.orientation == 180):
+            #Screen rows are the panel rows upside down
+            top, bottom = bottom, top
+        self.wr_cmd(_TOP_FIXED_AREA_1, top & 0xFF)
+        self.wr_cmd(_TOP_FIXED_AREA_2, top >> 8)
+        self.wr_cmd(_SCROLL_AREA_1, height & 0xFF)
+        self.wr_cmd(_SCROLL_AREA_2, height >> 8)
+        self.wr_cmd(_BOTTOM_FIXED_AREA_1, bottom & 0xFF)
+        self.wr_cmd(_BOTTOM_FIXED_AREA_2, bottom >> 8)
+        self.scroll_top = top #in panel rows
+        self.scroll_height = height
+        self.scroll(0)
+        self.wr_cmd(_DISPLAY_MODE_CONTROL, _SCROLL_ON)
+
+    def scroll(self, offset):
+        """
+        Shows the scroll area moved up by offset rows, rows moved out at the top come back at the bottom.
+        Only the scroll start register is written, nothing is redrawn
+        """
+        if not self.scroll_height:
+            raise ValueError("Scroll area isn't set, see set_scroll_area()")
+        offset %= self.scroll_height
+        self.scroll_offset = offset
+        if(self.orientation == 180):
+            offset = (self.scroll_height - offset) % self.scroll_height
+        start = self.scroll_top + offset
+        self.wr_cmd(_SCROLL_START_1, start & 0xFF)
+        self.wr_cmd(_SCROLL_START_2, start >> 8)
+
+    def scroll_off(self):
+        self.wr_cmd(_DISPLAY_MODE_CONTROL, 0x00)
+        self.scroll_height = 0
+    
+    def reset(self):
+        self.display_cs_disable()
+        
+        self.rst_enable()
+        time.sleep_ms(50)
+        self.rst_disable()
+        time.sleep_ms(120)
+        self.invalidate_registers()
+        self.scroll_height = 0
+
+        #Initial setup commands
+        
+        #driving ability
+        self.wr_cmd(_POWER_CONTROL_INTERNAL_USE_1, 0x00) 
+        self.wr_cmd(_POWER_CONTROL_INTERNAL_USE_2, 0x20) 
+        self.wr_cmd(_SOURCE_CONTROL_INTERNAL_USE_1, 0x0C) 
+        self.wr_cmd(_SOURCE_CONTROL_INTERNAL_USE_2, 0xC4) 
+        self.wr_cmd(_SOURCE_OP_CONTROL_NORMAL, 0x40) 
+        self.wr_cmd(_SOURCE_OP_CONTROL_IDLE, 0x38) 
+        self.wr_cmd(0xF1, 0x01) 
+        self.wr_cmd(0xF2, 0x10) 
+        self.wr_cmd(_DISPLAY_CONTROL_2, 0xA3)
+        #power voltage
+        self.wr_cmd(_POWER_CONTROL_2, 0x1B)
+        self.wr_cmd(_POWER_CONTROL_1, 0x01)
+        self.wr_cmd(_VCOM_CONTROL_2, 0x2F)
+        self.wr_cmd(_VCOM_CONTROL_3, 0x57)
+        #VCOM offset
+        self.wr_cmd(_VCOM_CONTROL_1, 0x8D)
+        #power on
+        self.wr_cmd(_OSC_CONTROL_2, 0x36)
+        #start osc
+        self.wr_cmd(_OSC_CONTROL_1, 0x01)
+        #wakeup
+        self.wr_cmd(_DISPLAY_MODE_CONTROL, 0x00)
+        self.wr_cmd(_POWER_CONTROL_6, 0x88)
+        time.sleep_ms(5)
+        self.wr_cmd(_POWER_CONTROL_6, 0x80)
+        time.sleep_ms(5)
+        self.wr_cmd(_POWER_CONTROL_6, 0x90)
+        time.sleep_ms(5)
+        self.wr_cmd(_POWER_CONTROL_6, 0xD0)
+        time.sleep_ms(5)
+        #color selection
+        self.wr_cmd(_COLMOD, 0x05) #0x05=65k, 0x06=262k
+        #panel characteristic
+        self.wr_cmd(_PANEL_CHARACTERISTIC, 0x00)
+        #display options
+        self.wr_cmd(_MEMORY_ACCESS_CONTROL, 0xA8) # 0xA8 RGB, 0xA0 BGR (even though datasheet says otherwise)
+        self.wr_cmd(_COLUMN_ADDRESS_START_1, 0x00) #x0
+        self.wr_cmd(_COLUMN_ADDRESS_START_2, 0x00) #x0
+        self.wr_cmd(_COLUMN_ADDRESS_END_1, ((_LCD_WIDTH-1)>>0)&0xFF)
+        self.wr_cmd(_COLUMN_ADDRESS_END_2, ((_LCD_WIDTH-1)>>8)&0xFF)
+        self.wr_cmd(_ROW_ADDRESS_START_1, 0x00) #y0
+        self.wr_cmd(_ROW_ADDRESS_START_2, 0x00) #y0
+        self.wr_cmd(_ROW_ADDRESS_END_1, ((_LCD_HEIGHT-1)>>0)&0xFF)
+        self.wr_cmd(_ROW_ADDRESS_END_2, ((_LCD_HEIGHT-1)>>8)&0xFF)
+        #display on
+        self.wr_cmd(_DISPLAY_CONTROL_3, 0x38)
+        time.sleep_ms(50)
+        self.wr_cmd(_DISPLAY_CONTROL_3, 0x3C)
+        time.sleep_ms(5)
+        
+    def invalidate_registers(self):
+        """
+        Forgets all shadowed register values, so the following writes are sent to the controller.
+        Call it after the controller was reset or written to outside of the driver
+        """
+        for i in range(256):
+            self.reg_shadow[i] = -1
+
+    def wr_cmd(self, cmd, param):
+       #Writes that would not change the register value are skipped
+       if self.reg_shadow[cmd] == param:
+           return
+       self.reg_shadow[cmd] = param
+       self.wr_reg(cmd, param)
+
+    def wr_reg(self, cmd, param):
+       #Sends the register write, without looking at the shadow
+       if self.bus.owner != self.display_dev:
+           self.bus.acquire(self.display_dev)
+
+       self.reg_buf[1] = cmd
+       self.data_buf[1] = param
+       cs = self.display_cs
+
+       cs(0)
+       self.spi.write(self.reg_buf)
+       cs(1)
+
+       cs(0)
+       self.spi.write(self.data_buf)
+       cs(1)
+
+    def rd_spi(self, num_of_bytes):
+        #reads bytes from SPI in big endian format, one and two byte reads use preallocated buffers
+        if num_of_bytes == 1:
+            self.spi.readinto(self.rd_buf1)
+            return self.rd_buf1[0]
+        if num_of_bytes == 2:
+            buf = self.rd_buf2
+            self.spi.readinto(buf)
+            return (buf[0] << 8) | buf[1]
+        return int.from_bytes(self.spi.read(num_of_bytes), "big")
+
+    def wr_spi(self, data):
+        self.byte_buf[0] = data
+        self.spi.write(self.byte_buf)
+        
+    def wr_buf_spi(self, buf):
+        self.spi.write(buf)
@@ -0,0 +1,156 @@
+"""
+Bitmap fonts for the MI0283QT2 drivers. Font files are made from BDF fonts by tools/make_font.py, only the index
+is kept in RAM, glyphs are read from the file when they are first used and kept in an LRU cache.
+
+    font = Font("digits32.font")
+    font.draw(disp, "12.5", 10, 10, 0xFFFF, 0x0000)         #straight to the screen
+    font.text(disp.get_framebuf(), "12.5", 10, 10, 0xFFFF)  #into a framebuffer
+
+Font file format, numbers are little endian:
+    "MFNT", version (1 byte), height (1 byte), number of glyphs (2 bytes)
+    for every glyph: character code (2 bytes), width (1 byte), offset of the bitmap in the file (4 bytes)
+    glyph bitmaps, height rows of (width + 7) // 8 bytes, the first pixel in the highest bit (framebuf.MONO_HLSB)
+Glyphs are whole character cells, the width is the advance to the next character.
+"""
+from micropython import const
+import framebuf
+from MI0283QT2_image import read_u16, read_u32, LRUCache
+
+_FONT_VERSION = const(1)
+#Character drawn for characters missing in the font
+_REPLACEMENT = const(0x3F) #"?"
+
+class Font(object):
+    """
+    Bitmap font read from a font file. Glyphs are cached in an LRU cache of at most cache_bytes bytes: 1 bit per
+    pixel bitmaps for text(), and bitmaps already converted to RGB565 for draw() for every color pair and scale
+    they are drawn with. A cached glyph is drawn with a single blit or a single screen window.
+    scale draws every pixel of the font as a scale x scale square
+    """
+    def __init__(self, path, cache_bytes=8192):
+        self.f = open(path, "rb")
+        header = self.f.read(8)
+        if header[0:4] != b"MFNT" or header[4] != _FONT_VERSION:
+            raise ValueError("Not a font file")
+        self.height = header[5]
+        count = read_u16(header, 6)
+
+        self.index = {} #character code: (width, offset)
+        self.max_width = 0
+        entries = self.f.read(count * 7)
+        for i in range(0, count * 7, 7):
+            width = entries[i + 2]
+            self.index[read_u16(entries, i)] = (width, read_u32(entries, i + 3))
+            self.max_width = max(self.max_width, width)
+
+        self.cache = LRUCache(cache_bytes) #key: (width, height, buffer, FrameBuffer of buffer)
+        #Two pixel framebuffer mapping the bits of a glyph to colors
+        self.palette_buf = bytearray(4)
+
+    def close(self):
+        self.f.close()
+
+    def size(self, text, scale=1):
+        """
+        Returns (width, height) of text in pixels
+        """
+        width = 0
+        for ch in text:
+            glyph = self.index.get(ord(ch))
+            if glyph == None:
+                glyph = self.index.get(_REPLACEMENT)
+            if glyph != None:
+                width += glyph[0]
+        return (width * scale, self.height * scale)
+
+    def text(self, fbuf, text, x, y, color, background=None, color_format=framebuf.RGB565, scale=1):
+        """
+        Draws text into framebuffer fbuf with its top left corner at (x, y). color and background are given like
+        to the other drawing methods of fbuf, background None leaves the pixels behind the text unchanged.
+        color_format is the format of fbuf. Returns x after the text
+        """
+        palette = framebuf.FrameBuffer(self.palette_buf, 2, 1, color_format)
+        if background == None:
+            #Background pixels get a color different from color and are skipped as the key color
+            key = color ^ 1
+            palette.pixel(0, 0, key)
+        else:
+            key = -1
+            palette.pixel(0, 0, background)
+        palette.pixel(1, 0, color)
+        for ch in text:
+            glyph = self.glyph(ord(ch), scale)
+            if glyph != None:
+                fbuf.blit(glyph[3], x, y, key, palette)
+                x += glyph[0]
+        return x
+
+    def draw(self, display, text, x, y, color_rgb565, background_rgb565, scale=1):
+        """
+        Draws text straight to the screen with its top left corner at (x, y), one screen window per character.
+        The background is always drawn, the screen can't be read back. Returns x after the text
+        """
+        for ch in text:
+            glyph = self.glyph_rgb565(ord(ch), color_rgb565, background_rgb565, scale)
+            if glyph != None:
+                display.draw_stream(x, y, glyph[0], glyph[1], (glyph[2],))
+                x += glyph[0]
+        return x
+
+    def glyph(self, code, scale=1):
+        """
+        Returns cached glyph (width, height, buffer, framebuf.MONO_HLSB FrameBuffer), None if the font has
+        neither it nor the replacement character
+        """
+        if code not in self.index:
+            if _REPLACEMENT not in self.index:
+                return None
+            code = _REPLACEMENT
+        key = (code, scale)
+        glyph = self.cache.get(key)
+        if glyph != None:
+            return glyph
+
+        width, offset = self.index[code]
+        self.f.seek(offset)
+        buf = bytearray(self.f.read(((width + 7) >> 3) * self.height))
+        fb = framebuf.FrameBuffer(buf, width, self.height, framebuf.MONO_HLSB)
+        if scale > 1:
+            bits = fb
+            buf = bytearray(((width * scale + 7) >> 3) * self.height * scale)
+            fb = framebuf.FrameBuffer(buf, width * scale, self.height * scale, framebuf.MONO_HLSB)
+            for j in range(self.height):
+                for i in range(width):
+                    if bits.pixel(i, j):
+                        fb.fill_rect(i * scale, j * scale, scale, scale, 1)
+        glyph = (width * scale, self.height * scale, buf, fb)
+        self.cache.add(key, glyph, len(buf))
+        return glyph
+
+    def glyph_rgb565(self, code, color_rgb565, background_rgb565, scale=1):
+        """
+        Returns cached glyph (width, height, buffer, FrameBuffer) with RGB565 pixels in byte order of the display
+        """
+        key = (code, scale, color_rgb565, background_rgb565)
+        glyph = self.cache.get(key)
+        if glyph != None:
+            return glyph
+        bits = self.glyph(code, scale)
+        if bits == None:
+            return None
+
+        width = bits[0]
+        height = bits[1]
+        buf = bytearray(width * height * 2)
+        fb = framebuf.FrameBuffer(buf, width, height, framebuf.RGB565)
+        #Palette colors are byte swapped, the glyph buffer is then ready to send with draw_stream()
+        palette = framebuf.FrameBuffer(self.palette_buf, 2, 1, framebuf.RGB565)
+        palette.pixel(0, 0, ((background_rgb565 & 0xFF) << 8) | (background_rgb565 >> 8))
+        palette.pixel(1, 0, ((color_rgb565 & 0xFF) << 8) | (color_rgb565 >> 8))
+        fb.blit(bits[3], 0, 0, -1, palette)
+        glyph = (width, height, buf, fb)
+        self.cache.add(key, glyph, len(buf))
+        return glyph
+
+    def clear_cache(self):
+        self.cache.clear()
@@ -0,0 +1,203 @@
+"""
+Streaming image readers for draw_stream() of the MI0283QT2 drivers. Images are read a few rows at a time into
+buffers that are reused, so drawing a full screen image needs only a few kB of RAM instead of a framebuffer.
+
+    from MI0283QT2_image import draw_bmp
+    draw_bmp(disp, "image.bmp", 0, 0)
+"""
+
+def read_u16(data, pos):
+    return data[pos] | (data[pos + 1] << 8)
+
+def read_u32(data, pos):
+    return data[pos] | (data[pos + 1] << 8) | (data[pos + 2] << 16) | (data[pos + 3] << 24)
+
+def read_i32(data, pos):
+    value = read_u32(data, pos)
+    if value & 0x80000000:
+        value -= 0x100000000
+    return value
+
+class BMPReader(object):
+    """
+    Reads uncompressed 24 bit, 16 bit RGB565 (BI_BITFIELDS) and 16 bit RGB555 BMP files. Iterating over it
+    gives buffers of up to rows screen rows converted to RGB565 in byte order of the display, top row first.
+    Bottom-up files (the usual kind) are read backwards a chunk at a time
+    f - file opened in binary mode
+    """
+    def __init__(self, f, rows=8):
+        self.f = f
+        header = f.read(54)
+        if len(header) < 54 or header[0] != 0x42 or header[1] != 0x4D: #"BM"
+            raise ValueError("Not a BMP file")
+        self.offset = read_u32(header, 10)
+        self.width = read_i32(header, 18)
+        height = read_i32(header, 22)
+        self.top_down = height < 0
+        self.height = abs(height)
+        self.bpp = read_u16(header, 28)
+        compression = read_u32(header, 30)
+
+        self.rgb555 = False
+        if self.bpp == 24 and compression == 0:
+            pass
+        elif self.bpp == 16 and compression == 0:
+            self.rgb555 = True
+        elif self.bpp == 16 and compression == 3:
+            #Color masks follow the 40 byte header, also in the longer header versions
+            masks = f.read(12)
+            if read_u32(masks, 0) == 0x7C00:
+                self.rgb555 = True
+            elif read_u32(masks, 0) != 0xF800:
+                raise ValueError("Only RGB565 and RGB555 16 bit BMP files are supported")
+        else:
+            raise ValueError("Only uncompressed 16 and 24 bit BMP files are supported")
+
+        #Rows in the file are padded to 4 bytes
+        self.stride = (self.width * self.bpp // 8 + 3) & ~3
+        self.rows = max(min(rows, self.height), 1)
+        self.in_buf = bytearray(self.stride * self.rows)
+        self.out_buf = bytearray(self.width * 2 * self.rows)
+
+    def __iter__(self):
+        in_mv = memoryview(self.in_buf)
+        out_mv = memoryview(self.out_buf)
+        row_size = self.width * 2
+        row = 0
+        while row < self.height:
+            n = min(self.rows, self.height - row)
+            if self.top_down:
+                file_row = row
+            else:
+                file_row = self.height - row - n
+            self.f.seek(self.offset + file_row * self.stride)
+            self.f.readinto(in_mv[:n * self.stride])
+            for i in range(n):
+                #Bottom-up chunk has the top row last
+                src = i if self.top_down else n - 1 - i
+                self.convert_row(src * self.stride, i * row_size)
+            yield out_mv[:n * row_size]
+            row += n
+
+    def convert_row(self, src, dst):
+        data = self.in_buf
+        out = self.out_buf
+        end = dst + self.width * 2
+        if self.bpp == 24:
+            while dst < end:
+                #Pixels are stored as B, G, R
+                c = ((data[src + 2] & 0xF8) << 8) | ((data[src + 1] & 0xFC) << 3) | (data[src] >> 3)
+                out[dst] = c >> 8
+                out[dst + 1] = c & 0xFF
+                src += 3
+                dst += 2
+        elif self.rgb555:
+            while dst < end:
+                c = data[src] | (data[src + 1] << 8)
+                #Green gets its highest bit repeated as the sixth bit
+                c = ((c & 0x7FE0) << 1) | ((c >> 4) & 0x20) | (c & 0x1F)
+                out[dst] = c >> 8
+                out[dst + 1] = c & 0xFF
+                src += 2
+                dst += 2
+        else:
+            while dst < end:
+                #Little endian in the file, big endian on the display
+                out[dst] = data[src + 1]
+                out[dst + 1] = data[src]
+                src += 2
+                dst += 2
+
+class RawReader(object):
+    """
+    Reads raw RGB565 images, width * height pixels without a header. Iterating over it gives buffers of up to
+    rows screen rows. Pixels are big endian (byte order of the display) unless little_endian is set
+    f - file opened in binary mode
+    """
+    def __init__(self, f, width, height, rows=8, little_endian=False):
+        self.f = f
+        self.width = width
+        self.height = height
+        self.little_endian = little_endian
+        self.rows = max(min(rows, height), 1)
+        self.buf = bytearray(width * 2 * self.rows)
+
+    def __iter__(self):
+        mv = memoryview(self.buf)
+        row_size = self.width * 2
+        row = 0
+        while row < self.height:
+            n = min(self.rows, self.height - row)
+            size = self.f.readinto(mv[:n * row_size])
+            if not size:
+                return
+            n = size // row_size
+            if self.little_endian:
+                buf = self.buf
+                for i in range(0, n * row_size, 2):
+                    buf[i], buf[i + 1] = buf[i + 1], buf[i]
+            yield mv[:n * row_size]
+            row += n
+
+class LRUCache(object):
+    """
+    Cache of at most max_bytes bytes, the least recently used entries are removed to make room for new ones.
+    Used for decoded images like sprites and glyphs, the size of an entry is given when it is added
+    """
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = {} #key: (value, size)
+        self.order = [] #keys, the least recently used first
+        self.used = 0
+
+    def get(self, key):
+        """
+        Returns the value of key and marks it as recently used, None if it isn't cached
+        """
+        entry = self.entries.get(key)
+        if entry == None:
+            return None
+        self.order.remove(key)
+        self.order.append(key)
+        return entry[0]
+
+    def make_room(self, size):
+        """
+        Removes least recently used entries until size bytes fit, call it before allocating a new entry.
+        Returns False when size is larger than the whole cache
+        """
+        if size > self.max_bytes:
+            return False
+        while self.used + size > self.max_bytes:
+            self.used -= self.entries.pop(self.order.pop(0))[1]
+        return True
+
+    def add(self, key, value, size):
+        """
+        Adds value of size bytes, values larger than the whole cache aren't kept
+        """
+        if not self.make_room(size):
+            return
+        self.entries[key] = (value, size)
+        self.order.append(key)
+        self.used += size
+
+    def clear(self):
+        self.entries = {}
+        self.order = []
+        self.used = 0
+
+def draw_bmp(display, path, x=0, y=0, rows=8):
+    """
+    Draws BMP file on the display with its top left corner at (x, y)
+    """
+    with open(path, "rb") as f:
+        image = BMPReader(f, rows)
+        display.draw_stream(x, y, image.width, image.height, image)
+
+def draw_raw(display, path, x, y, width, height, rows=8, little_endian=False):
+    """
+    Draws raw RGB565 file of width * height pixels on the display with its top left corner at (x, y)
+    """
+    with open(path, "rb") as f:
+        display.draw_stream(x, y, width, height, RawReader(f, width, height, rows, little_endian))
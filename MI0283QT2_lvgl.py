@@ -1,121 +1,74 @@
-from machine import Pin, SPI
 from micropython import const
+from MI0283QT2_core import MI0283QT2_core
 import time
 
-class MI0283QT2_lvgl(object):
+#Automatically sized render buffers take at most 1/AUTO_BUF_MEM_SHARE of free memory
+_AUTO_BUF_MEM_SHARE = const(4)
+#Minimal number of screen lines in an automatically sized render buffer
+_AUTO_BUF_MIN_LINES = const(8)
+
+#Number of touch samples taken during flushes that can wait for LVGL
+_TOUCH_QUEUE_LEN = const(8)
+
+#Number of bins of the frame histograms and width of the time bins in us
+_FRAME_HIST_BINS = const(16)
+_FRAME_BIN_US = const(2000)
+
+class MI0283QT2_lvgl(MI0283QT2_core):
     """
     For orientation related information and more information about the display controller consult the HX8347-D datasheet
     For more information about the touch screen controller consult the XPT2046 / ADS7846 datasheet
 
-    IMPORTANT! Keep in mind because SPI bus is shared, touch screen will not be detected while the screen is
-    being drawn on.
+    IMPORTANT! Keep in mind because SPI bus is shared, touch screen can't be read while the screen is being
+    drawn on. To keep input responsive during large redraws every flushed area is sent in slices of about
+    flush_slice bytes and the touch screen is sampled between slices when touch_period ms have passed since
+    the last sample. The samples are queued and reported to LVGL in order. flush_slice=0 disables it.
+
+    If touch_irq pin (PENIRQ of the touch screen controller) is given, the controller is read only after the
+    pen interrupt fired or while the screen is pressed. Otherwise polls return RELEASED without SPI traffic.
+
+    Touch screens differ between units, run calibrate() once and keep the result with save_calibration(),
+    then load it with load_calibration() at startup
+
+    Display setup, drawing primitives and touch reading come from MI0283QT2_core
+
+    With double_buffer=True LVGL gets two render buffers. With async_flush=True the SPI transfer runs on
+    a second thread and flush_ready() is called when it completes, so LVGL renders the next area while
+    the previous one is being sent. Together they let rendering and transfer overlap. When LVGL has to wait
+    for the thread it blocks on a lock in flush_wait_cb() instead of spinning in C, so the flush thread also
+    runs on ports where threads share a global interpreter lock (ESP32).
+
+    render_mode selects LVGL render mode (lv.DISPLAY_RENDER_MODE.PARTIAL, DIRECT or FULL), PARTIAL by default.
+    In PARTIAL mode buffer size is buf_size bytes, or 1/buf_fraction of the screen when buf_size is not
+    given. buf_size="auto" sizes buffers from free memory at startup. DIRECT and FULL always use
+    screen sized buffers.
+
+    With swapped_render=True (default) LVGL renders in byte order of the display (RGB565_SWAPPED), so the
+    pixels are sent without change. If LVGL doesn't support it, or swapped_render=False, bytes of every
+    flushed area are swapped before sending.
+
+    Call timer_handler() of the driver instead of lv.timer_handler(), it records render time, flush time and
+    flushed pixels of every frame in histograms (see frame_stats()). It skips the call while an area is still
+    being sent by the flush thread, so frames don't stack when the bus falls behind, and with max_fps it
+    limits how often LVGL runs.
+
+    With asyncio start the task run() instead of timers, it advances the LVGL tick from time.ticks_ms(), calls
+    timer_handler() and sleeps until LVGL needs it again or the pen interrupt fires, so other tasks run between
+    frames, a static screen doesn't wake the CPU and LVGL never runs in interrupt context while SPI is busy.
+
+    wait_flush() waits for the flush thread without blocking the event loop. Touch events for other tasks
+    come from touch_events()
     """
-    
-    #Command set registers
-    POWER_CONTROL_INTERNAL_USE_1 = const(0xEA)
-    POWER_CONTROL_INTERNAL_USE_2 = const(0xEB)
-    SOURCE_CONTROL_INTERNAL_USE_1 = const(0xEC)
-    SOURCE_CONTROL_INTERNAL_USE_2 = const(0xED)
-    SOURCE_OP_CONTROL_NORMAL = const(0xE8)
-    SOURCE_OP_CONTROL_IDLE = const(0xE9)
-    DISPLAY_CONTROL_2 = const(0x27)
-    POWER_CONTROL_2 = const(0x1B)
-    POWER_CONTROL_1 = const(0x1A)
-    VCOM_CONTROL_1 = const(0x23)
-    VCOM_CONTROL_2 = const(0x24)
-    VCOM_CONTROL_3 = const(0x25)
-    OSC_CONTROL_2 = const(0x18)
-    OSC_CONTROL_1 = const(0x19)
-    DISPLAY_MODE_CONTROL = const(0x01)
-    POWER_CONTROL_6 = const(0x1F)
-    COLMOD = const(0x17)
-    PANEL_CHARACTERISTIC = const(0x36)
-    MEMORY_ACCESS_CONTROL = const(0x16)
-    COLUMN_ADDRESS_START_1 = const(0x03)
-    COLUMN_ADDRESS_START_2 = const(0x02)
-    COLUMN_ADDRESS_END_1 = const(0x05)
-    COLUMN_ADDRESS_END_2 = const(0x04)
-    ROW_ADDRESS_START_1 = const(0x07)
-    ROW_ADDRESS_START_2 = const(0x06)
-    ROW_ADDRESS_END_1 = const(0x09)
-    ROW_ADDRESS_END_2 = const(0x08)
-    DISPLAY_CONTROL_3 = const(0x28)
-    
-    #LCD commands
-    LCD_ID = const(0)
-    LCD_DATA = const((0x72)|(LCD_ID<<2))
-    LCD_REGISTER = const((0x70)|(LCD_ID<<2))
-    
-    #Touch commands
-    ADS_CMD_START = const(0x80)
-    ADS_CMD_12BIT = const(0x00)
-    ADS_CMD_8BIT = const(0x08)
-    ADS_CMD_DIFF = const(0x00)
-    ADS_CMD_X_POS = const(0x50)
-    ADS_CMD_Y_POS = const(0x10)
-    ADS_CMD_Z1_POS = const(0x30)
-    ADS_CMD_Z2_POS = const(0x40)
-    ADS_CMD_ALWAYS_ON = const(0x02)
-    ADS_CMD_POWER_OFF = const(0x00)
-
-    #Minimal pressure for touch detection
-    MIN_PRESSURE = const(2) #Value range from 1 to 254
-    
-    #Touch offset
-    X_MIN = const(170)
-    X_MAX = const(3815)
-    Y_MIN = const(286)
-    Y_MAX = const(3839)
-    
-    DISPLAY_SPI_SPEED = const(24000000) 
-    TOUCH_SPI_SPEED = const(1000000)
-    
-    #Default screen size values
-    LCD_WIDTH = const(320)
-    LCD_HEIGHT = const(240)
-    
+
+    STATS_METHODS = MI0283QT2_core.STATS_METHODS + (("flush", "send_area"),)
+
     #MOSI is SDI, MISO is SDO
-    def __init__(self, spi_id, sck, mosi, miso, rst, led, display_cs, touch_cs=None, orientation=0):
-         
-        # Pin setup
-        self.rst = rst
-        self.rst.init(mode = Pin.OUT)
-        self.rst_enable()
-        
-        self.led = led
-        self.led.init(mode = Pin.OUT)
-        self.led_disable()
-        
-        self.display_cs = display_cs
-        self.display_cs.init(mode = Pin.OUT)
-        self.display_cs_disable()
-        
-        if touch_cs != None:
-            self.touch_cs = touch_cs
-            self.touch_cs.init(mode = Pin.OUT)
-            self.touch_cs_disable()
-        
-        # SPI setup
-        self.spi_id = spi_id
-        self.sck = sck
-        self.mosi = mosi
-        self.miso = miso
-        self.spi = SPI(spi_id, baudrate=DISPLAY_SPI_SPEED,
-                       sck = self.sck,
-                       mosi = self.mosi,
-                       miso = self.miso)
-        
-        print(self.spi)
-        
-        self.reset()
-        
-        self.width = LCD_WIDTH
-        self.height = LCD_HEIGHT
-        self.orientation = orientation
-        self.setOrientation(self.orientation)
-        
-        self.led_enable()
-                
+    def __init__(self, spi_id, sck, mosi, miso, rst, led, display_cs, touch_cs=None, orientation=0, bus=None,
+                 touch_irq=None,
+                 double_buffer=False, async_flush=False, render_mode=None, buf_size=None, buf_fraction=10,
+                 swapped_render=True, flush_slice=2048, touch_period=20, max_fps=0):
+        super().__init__(spi_id, sck, mosi, miso, rst, led, display_cs, touch_cs, orientation, bus, touch_irq)
+
         #LVGL display and input driver connection
         try:
             global lv
@@ -130,67 +83,381 @@ class MI0283QT2_lvgl(object):
         
         #Display driver connection
         self.disp_drv = lv.display_create(self.width, self.height)
-        self.disp_drv.set_color_format(lv.COLOR_FORMAT.RGB565)
+        #Render in byte order of the display when LVGL supports it, otherwise swap bytes on every flush
+        self.swap_bytes = not (swapped_render and hasattr(lv.COLOR_FORMAT, "RGB565_SWAPPED"))
+        if self.swap_bytes:
+            self.disp_drv.set_color_format(lv.COLOR_FORMAT.RGB565)
+        else:
+            self.disp_drv.set_color_format(lv.COLOR_FORMAT.RGB565_SWAPPED)
         self.pixel_size = 2
-        self.buf_size = int(self.width * self.height * self.pixel_size / 10)
+        if render_mode == None:
+            render_mode = lv.DISPLAY_RENDER_MODE.PARTIAL
+        self.render_mode = render_mode
+        self.direct_mode = render_mode == lv.DISPLAY_RENDER_MODE.DIRECT
+        self.buf_size = self.get_buf_size(render_mode, buf_size, buf_fraction, double_buffer)
         self.buf1 = bytearray(self.buf_size)
-        self.disp_drv.set_buffers(self.buf1, None, self.buf_size, lv.DISPLAY_RENDER_MODE.PARTIAL)
+        self.buf2 = bytearray(self.buf_size) if double_buffer else None
+        self.disp_drv.set_buffers(self.buf1, self.buf2, self.buf_size, render_mode)
         self.disp_drv.set_flush_cb(self.flush_cb)
 
+        #Background flush setup
+        self.bus_lock = None
+        self.flush_thread = False
+        self.flush_flag = None #asyncio.ThreadSafeFlag set after every area, see wait_flush()
+        self.touch_flag = None #asyncio.ThreadSafeFlag of run() set by the pen interrupt
+        if async_flush:
+            try:
+                import _thread
+                self.bus_lock = _thread.allocate_lock()
+                #Released by flush_cb when an area is ready to be sent
+                self.flush_request = _thread.allocate_lock()
+                self.flush_request.acquire()
+                #Held while an area is being sent, flush_wait_cb() waits for it
+                self.flush_done = _thread.allocate_lock()
+                self.flush_area = [0, 0, 0, 0, 0, 0] #x1, y1, x2, y2, offset, stride
+                self.flush_data = None
+                _thread.start_new_thread(self.flush_worker, ())
+                self.flush_thread = True
+                self.disp_drv.set_flush_wait_cb(self.flush_wait_cb)
+            except ImportError:
+                print("_thread doesn't exist, flushing in the foreground")
+        self.last_reading = (-1, -1)
+
+        #Frame timing, see timer_handler()
+        self.frame_period = 1000 // max_fps if max_fps else 0
+        self.frame_ms = time.ticks_ms() #start of the last frame
+        self.frame_running = False
+        self.frame_pixels = 0 #pixels flushed in the current frame
+        self.frame_flush_us = 0 #time spent sending the current frame
+        self.frame_render_us = 0
+        self.render_hist = [0] * _FRAME_HIST_BINS
+        self.flush_hist = [0] * _FRAME_HIST_BINS
+        self.pixel_hist = [0] * _FRAME_HIST_BINS
+        self.reset_frame_stats()
+
+        #Touch sampling between flush slices
+        self.flush_slice = flush_slice if touch_cs != None else 0
+        self.touch_period = touch_period
+        self.touch_ms = time.ticks_ms() #time of the last touch sample
+        self.touch_queue = [None] * _TOUCH_QUEUE_LEN
+        #flush writes and read_cb reads the queue, each index is changed by only one side
+        self.touch_queue_w = 0
+        self.touch_queue_r = 0
+
         #Touch screen driver connection
         self.indev_drv = lv.indev_create()
         self.indev_drv.set_type(lv.INDEV_TYPE.POINTER)
         self.indev_drv.set_display(self.disp_drv)
         self.indev_drv.set_read_cb(self.read_cb)
-        
 
-    """
-        Helper functions for pin setup
-    """
-    def led_enable(self):
-        self.led.high()
-    
-    def led_disable(self):
-        self.led.low()
-        
-    def rst_enable(self):
-        self.rst.low()
-        
-    def rst_disable(self):
-        self.rst.high()
-        
-    def display_cs_enable(self):
-        self.display_cs.low()
-        
-    def display_cs_disable(self):
-        self.display_cs.high()
-    
-    def touch_cs_enable(self):
-        self.touch_cs.low()
-        
-    def touch_cs_disable(self):
-        self.touch_cs.high()
+    def get_buf_size(self, render_mode, buf_size, buf_fraction, double_buffer):
+        """
+        Returns size of one render buffer in bytes, rounded down to whole screen lines
+        """
+        line_size = self.width * self.pixel_size
+        screen_size = line_size * self.height
+        if render_mode != lv.DISPLAY_RENDER_MODE.PARTIAL:
+            return screen_size
 
+        if buf_size == "auto":
+            import gc
+            gc.collect()
+            buf_size = gc.mem_free() // _AUTO_BUF_MEM_SHARE
+            if double_buffer:
+                buf_size //= 2
+            buf_size = max(buf_size, line_size * _AUTO_BUF_MIN_LINES)
+        elif buf_size == None:
+            buf_size = screen_size // buf_fraction
+
+        buf_size = min(buf_size, screen_size)
+        if buf_size < line_size:
+            raise ValueError("Render buffer has to hold at least one screen line")
+        return buf_size - buf_size % line_size
 
     def flush_cb(self, disp_drv, area, color_p):
         """
         Function used by LVGL to draw on display
         disp_drv - lvgl display driver
         area - struct with drawing area coordinates
-        color_p - C_pointer to draw buffer (in little endian format)
+        color_p - C_pointer to draw buffer (in little endian format if swap_bytes is set, big endian otherwise)
         """
-        size = (area.x2 - area.x1 + 1) * (area.y2 - area.y1 + 1)
-        data_view = color_p.__dereference__(size * self.pixel_size)
-        lv.draw_sw_rgb565_swap(data_view, size) #Swaps endianess of bytes in buffer from little to big
-        self.set_area(area.x1, area.y1, area.x2, area.y2)
+        x1 = area.x1
+        y1 = area.y1
+        x2 = area.x2
+        y2 = area.y2
+        if self.direct_mode:
+            #Buffer is screen sized and the area is rendered at its place in it
+            data_view = memoryview(color_p.__dereference__(self.buf_size))
+            stride = self.width * self.pixel_size
+            offset = y1 * stride + x1 * self.pixel_size
+        else:
+            stride = (x2 - x1 + 1) * self.pixel_size
+            data_view = memoryview(color_p.__dereference__(stride * (y2 - y1 + 1)))
+            offset = 0
+        self.frame_pixels += (x2 - x1 + 1) * (y2 - y1 + 1)
+
+        if self.flush_thread:
+            #Hand the area over to flush_worker, it calls flush_ready() when the transfer is done
+            flush_area = self.flush_area
+            flush_area[0] = x1
+            flush_area[1] = y1
+            flush_area[2] = x2
+            flush_area[3] = y2
+            flush_area[4] = offset
+            flush_area[5] = stride
+            self.flush_data = data_view
+            self.flush_done.acquire()
+            self.flush_request.release()
+            return
+
+        start = time.ticks_us()
+        self.send_area(data_view, offset, stride, x1, y1, x2, y2)
+        self.frame_flush_us += time.ticks_diff(time.ticks_us(), start)
+        self.disp_drv.flush_ready()
+
+    def send_area(self, data, offset, stride, x1, y1, x2, y2):
+        """
+        Sends area rendered by LVGL to the screen
+        data - render buffer, the area starts at offset and its lines are stride bytes apart
+
+        The area is sent in slices of whole lines. When touch sampling is due between two slices the window
+        is closed, the touch screen is sampled and the window continues from the first line not sent yet
+        """
+        row_size = (x2 - x1 + 1) * self.pixel_size
+        rows = y2 - y1 + 1
+
+        if self.swap_bytes:
+            if self.direct_mode:
+                self.swap_rows(data, offset, stride, row_size, rows)
+            else:
+                lv.draw_sw_rgb565_swap(data, rows * row_size // self.pixel_size) #Swaps endianess from little to big
+
+        if self.flush_slice:
+            slice_rows = max(self.flush_slice // row_size, 1)
+        else:
+            slice_rows = rows
+
+        self.set_area(x1, y1, x2, y2)
         self.draw_start()
-        
-        self.wr_buf_spi(data_view)
-    
+        y = y1
+        pos = offset
+        while True:
+            n = min(slice_rows, y2 - y + 1)
+            if row_size == stride:
+                self.wr_buf_spi(data[pos:pos + n * stride])
+                pos += n * stride
+            else:
+                for i in range(n):
+                    self.wr_buf_spi(data[pos:pos + row_size])
+                    pos += stride
+            y += n
+            if y > y2:
+                break
+            if not self.touch_idle() and time.ticks_diff(time.ticks_ms(), self.touch_ms) >= self.touch_period:
+                self.draw_stop()
+                self.queue_touch(self.touch_sample())
+                self.set_area(x1, y, x2, y2)
+                self.draw_start()
         self.draw_stop()
 
-        self.disp_drv.flush_ready()
+        if self.swap_bytes and self.direct_mode:
+            #DIRECT mode keeps the buffer content between frames, so it has to be swapped back
+            self.swap_rows(data, offset, stride, row_size, rows)
+
+    def queue_touch(self, reading):
+        """
+        Queues touch sample taken during a flush for read_cb, repeated releases are not queued
+        """
+        released = reading[0] == -1 and reading[1] == -1
+        if released and self.last_reading[0] == -1 and self.last_reading[1] == -1:
+            return
+        self.last_reading = reading
 
+        w = self.touch_queue_w
+        next_w = (w + 1) % _TOUCH_QUEUE_LEN
+        if next_w == self.touch_queue_r:
+            return #queue is full, LVGL hasn't read it for a while
+        self.touch_queue[w] = reading
+        self.touch_queue_w = next_w
+
+    def swap_rows(self, data, offset, stride, row_size, rows):
+        """
+        Swaps endianess of pixels in an area of a screen sized render buffer
+        """
+        if row_size == stride:
+            lv.draw_sw_rgb565_swap(data[offset:offset + rows * stride], rows * row_size // self.pixel_size)
+        else:
+            for i in range(rows):
+                lv.draw_sw_rgb565_swap(data[offset:offset + row_size], row_size // self.pixel_size)
+                offset += stride
+
+    def flush_worker(self):
+        """
+        Runs on the second thread and sends the areas handed over by flush_cb. LVGL only calls
+        flush_cb again after flush_ready(), so there is at most one area waiting
+        """
+        while True:
+            self.flush_request.acquire()
+            area = self.flush_area
+
+            self.bus_lock.acquire()
+            start = time.ticks_us()
+            self.send_area(self.flush_data, area[4], area[5], area[0], area[1], area[2], area[3])
+            self.frame_flush_us += time.ticks_diff(time.ticks_us(), start)
+            self.bus_lock.release()
+
+            self.flush_data = None
+            self.disp_drv.flush_ready()
+            if self.flush_flag != None:
+                self.flush_flag.set()
+            self.flush_done.release()
+
+    def flush_wait_cb(self, disp_drv):
+        """
+        Function used by LVGL to wait for the flush thread. LVGL would otherwise spin in C on its flushing flag
+        without giving up the interpreter lock, and on ports with one the flush thread could never finish
+        """
+        self.flush_done.acquire()
+        self.flush_done.release()
+
+    def timer_handler(self):
+        """
+        Runs lv.timer_handler() and records timing of the frame. The call is skipped while the previous one
+        is still running, while the flush thread is still sending an area and when it would exceed max_fps.
+        Returns time in ms until the next call is needed
+        """
+        if self.frame_running or (self.flush_thread and self.flush_data != None):
+            self.skipped_frames += 1
+            return 1
+        now = time.ticks_ms()
+        if self.frame_period:
+            wait = self.frame_period - time.ticks_diff(now, self.frame_ms)
+            if wait > 0:
+                self.skipped_frames += 1
+                return wait
+        self.frame_ms = now
+
+        #Flush thread has finished the previous frame
+        self.record_frame()
+
+        self.frame_running = True
+        start = time.ticks_us()
+        try:
+            delay = lv.timer_handler()
+        finally:
+            self.frame_running = False
+        if self.frame_pixels:
+            self.frame_render_us = time.ticks_diff(time.ticks_us(), start)
+            if not self.flush_thread:
+                #Areas were sent inside the handler
+                self.frame_render_us -= self.frame_flush_us
+                self.record_frame()
+        return delay
+
+    async def run(self, max_sleep=1000):
+        """
+        asyncio task running LVGL without periodic timers, replaces the tick and timer_handler() timers:
+            asyncio.create_task(disp.run())
+        The LVGL tick is advanced by the time.ticks_ms() difference before every timer_handler() call, ticks_ms()
+        itself wraps earlier than the 32 bit LVGL tick and can't be its source. The task sleeps as long as LVGL
+        asks for, at most max_sleep ms, other tasks run meanwhile. The last area of a frame is waited for with
+        wait_flush(). With touch_irq LVGL stops polling the touch screen while it isn't pressed and the pen
+        interrupt wakes the task, so a static screen costs next to no CPU time and animations still run on time
+        """
+        from MI0283QT2_async import asyncio
+        tick_ms = time.ticks_ms()
+        read_timer = self.indev_drv.get_read_timer()
+        if self.touch_irq != None and self.touch_cs != None and self.touch_flag == None:
+            self.touch_flag = asyncio.ThreadSafeFlag()
+            self.touch_flags.append(self.touch_flag)
+        paused = False
+        while True:
+            #LVGL reads its tick only inside timer_handler(), so it is always up to date there
+            now = time.ticks_ms()
+            lv.tick_inc(time.ticks_diff(now, tick_ms))
+            tick_ms = now
+            if paused and not self.touch_idle():
+                #Pen interrupt fired, LVGL reads the touch screen in this call
+                read_timer.resume()
+                read_timer.ready()
+                paused = False
+
+            delay = min(self.timer_handler(), max_sleep)
+            await self.wait_flush()
+
+            if self.touch_flag != None and not paused and self.touch_released():
+                read_timer.pause()
+                paused = True
+            if paused:
+                #The flag can be left set by an earlier interrupt, then the task only wakes up once too early
+                try:
+                    await asyncio.wait_for_ms(self.touch_flag.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await asyncio.sleep_ms(delay)
+
+    def touch_released(self):
+        """
+        Returns True when the touch screen isn't pressed and LVGL has already been told so
+        """
+        return (self.touch_idle() and self.touch_queue_r == self.touch_queue_w and
+                self.last_reading[0] == -1 and self.last_reading[1] == -1)
+
+    async def wait_flush(self):
+        """
+        Waits until the flush thread has sent the area handed over to it, without blocking other asyncio tasks.
+        Returns at once without async_flush, areas are then sent inside timer_handler()
+        """
+        if not self.flush_thread:
+            return
+        if self.flush_flag == None:
+            from MI0283QT2_async import asyncio
+            self.flush_flag = asyncio.ThreadSafeFlag()
+        #The flag can be left set by an earlier area, so the area is checked again after every wake up
+        while self.flush_data != None:
+            await self.flush_flag.wait()
+
+    def record_frame(self):
+        """
+        Adds the finished frame to the histograms, frames that didn't flush anything aren't counted
+        """
+        if not self.frame_pixels:
+            return
+        self.render_hist[min(self.frame_render_us // _FRAME_BIN_US, _FRAME_HIST_BINS - 1)] += 1
+        self.flush_hist[min(self.frame_flush_us // _FRAME_BIN_US, _FRAME_HIST_BINS - 1)] += 1
+        self.pixel_hist[min(self.frame_pixels * _FRAME_HIST_BINS // (self.width * self.height),
+                            _FRAME_HIST_BINS - 1)] += 1
+        self.frames += 1
+        self.frame_pixels = 0
+        self.frame_flush_us = 0
+
+    def frame_stats(self):
+        """
+        Returns frame statistics since reset_frame_stats() as a dict
+        frames - number of frames that flushed something
+        skipped - number of skipped timer_handler() calls
+        render, flush - histograms of render and flush time of a frame, bin i counts frames that took from
+                        i*bin_ms to (i+1)*bin_ms ms, the last bin also counts all longer frames
+        pixels - histogram of flushed pixels, bin i counts frames that flushed from i/bins to (i+1)/bins of the screen
+        """
+        return {"frames": self.frames, "skipped": self.skipped_frames, "bins": _FRAME_HIST_BINS,
+                "bin_ms": _FRAME_BIN_US / 1000, "render": list(self.render_hist), "flush": list(self.flush_hist),
+                "pixels": list(self.pixel_hist)}
+
+    def reset_frame_stats(self):
+        for i in range(_FRAME_HIST_BINS):
+            self.render_hist[i] = 0
+            self.flush_hist[i] = 0
+            self.pixel_hist[i] = 0
+        self.frames = 0
+        self.skipped_frames = 0
+
+    def set_max_fps(self, max_fps):
+        """
+        Limits how often timer_handler() runs LVGL, 0 removes the limit
+        """
+        self.frame_period = 1000 // max_fps if max_fps else 0
 
     def read_cb(self, indev_drv, data) -> int:
         """
@@ -198,7 +465,19 @@ class MI0283QT2_lvgl(object):
         indev_drv - lvgl input device driver
         data - reference to struct used to keep track of device reading (written to)
         """
-        reading = self.touch_read()
+        r = self.touch_queue_r
+        if r != self.touch_queue_w:
+            #Samples taken during flushes are reported first, LVGL reads again while there are more
+            reading = self.touch_queue[r]
+            r = (r + 1) % _TOUCH_QUEUE_LEN
+            self.touch_queue_r = r
+            data.continue_reading = r != self.touch_queue_w
+        elif self.bus_lock != None and self.bus_lock.locked():
+            #An area is being sent, report the last reading instead of waiting for the bus
+            reading = self.last_reading
+        else:
+            reading = self.touch_read()
+            self.last_reading = reading
 
         if(reading[0] == -1 and reading[1] == -1):
             data.state = lv.INDEV_STATE.RELEASED
@@ -209,223 +488,23 @@ class MI0283QT2_lvgl(object):
         data.state = lv.INDEV_STATE.PRESSED
         return True
 
-    def fill(self, color_rgb565):
-        self.set_area(0, 0, self.height-1, self.width-1)
-        self.draw_start()
-        for i in range(self.width * self.height):
-            self.draw(color_rgb565)
-        self.draw_stop()
-            
-    def set_area(self, x0, y0, x1, y1):
-        self.wr_cmd(COLUMN_ADDRESS_START_1, (x0>>0 & 0xFF)) 
-        self.wr_cmd(COLUMN_ADDRESS_START_2, (x0>>8 & 0xFF))
-        self.wr_cmd(COLUMN_ADDRESS_END_1, (x1>>0 & 0xFF)) 
-        self.wr_cmd(COLUMN_ADDRESS_END_2, (x1>>8 & 0xFF))
-        self.wr_cmd(ROW_ADDRESS_START_1, (y0>>0 & 0xFF)) 
-        self.wr_cmd(ROW_ADDRESS_START_2, (y0>>8 & 0xFF)) 
-        self.wr_cmd(ROW_ADDRESS_END_1, (y1>>0 & 0xFF)) 
-        self.wr_cmd(ROW_ADDRESS_END_2, (y1>>8 & 0xFF)) 
-
-    def draw_start(self):
-        self.display_cs_enable()
-        self.wr_spi(LCD_REGISTER)
-        self.wr_spi(0x22)
-        self.display_cs_disable()
-        
-        self.display_cs_enable()
-        self.wr_spi(LCD_DATA)
-        
-    def draw_stop(self):
-        self.display_cs_disable()
-    
-
     def touch_read(self):
         """
-        Return reading coordinates in the form of a (x, y) touple. If the touch screen is not 
-        pressed the result will be (-1, -1)
-        """
-        if self.touch_cs != None:
-            
-            """
-            New SPI configuration for touch screen controller, because the SPI bus is shared and 
-            the display and touch don't support the same SPI speeds
-            """
-            self.spi = SPI(self.spi_id, baudrate = TOUCH_SPI_SPEED,
-                          sck = self.sck,
-                          mosi = self.mosi,
-                          miso = self.miso)
-            
-            #get z data
-            self.touch_cs_enable()
-
-            self.wr_spi(ADS_CMD_START | ADS_CMD_8BIT | ADS_CMD_DIFF | ADS_CMD_Z1_POS | ADS_CMD_ALWAYS_ON)
-            a1 = self.rd_spi(1)&0x7F
-            self.wr_spi(ADS_CMD_START | ADS_CMD_8BIT | ADS_CMD_DIFF | ADS_CMD_Z2_POS | ADS_CMD_ALWAYS_ON)
-            a2 = (255-self.rd_spi(1))&0x7F
-            
-            self.touch_cs_disable()
-            pressure = a1 + a2
-
-            x_raw = -1
-            y_raw = -1
-            x = -1
-            y = -1
-            if(pressure < MIN_PRESSURE):
-                return (x, y)
-
-            self.touch_cs_enable()
-            
-            #get x data, two times for confidence
-            self.wr_spi(ADS_CMD_START | ADS_CMD_12BIT | ADS_CMD_DIFF | ADS_CMD_X_POS | ADS_CMD_ALWAYS_ON)
-            a1 = self.rd_spi(2)
-            self.wr_spi(ADS_CMD_START | ADS_CMD_12BIT | ADS_CMD_DIFF | ADS_CMD_X_POS | ADS_CMD_ALWAYS_ON)
-            a2 = self.rd_spi(2)
-            
-            #Two bytes are read but needed information is in bits [14:3], consult datasheet for more info
-            x_raw = (a2>>3) 
-
-            #get y data, two times for confidence
-            self.wr_spi(ADS_CMD_START | ADS_CMD_12BIT | ADS_CMD_DIFF | ADS_CMD_Y_POS | ADS_CMD_ALWAYS_ON)
-            a1 = self.rd_spi(2)
-            self.wr_spi(ADS_CMD_START | ADS_CMD_12BIT | ADS_CMD_DIFF | ADS_CMD_Y_POS | ADS_CMD_ALWAYS_ON)
-            a2 = self.rd_spi(2)
-
-            #Same reading procedure as for x_raw
-            y_raw = (a2>>3) 
-            
-            """
-            By default the touch controller has different orientation of x and y axis than LVGL.
-            For this reason we have to map it differently. Keep in mind such orientation 
-            will be used even when LVGL is not used.
-            """
-            if(self.orientation == 0):
-                x = self.map_touch(x_raw, X_MIN, X_MAX, 0, LCD_HEIGHT-1)
-                y = self.map_touch(y_raw, Y_MIN, Y_MAX, 0, LCD_WIDTH-1)
-            elif(self.orientation == 90):
-                x = self.map_touch(4095-y_raw, Y_MIN, Y_MAX, 0, LCD_WIDTH-1)
-                y = self.map_touch(x_raw, X_MIN, X_MAX, 0, LCD_HEIGHT-1)
-            elif(self.orientation == 180):
-                x = self.map_touch(4095-x_raw, X_MIN, X_MAX, 0, LCD_HEIGHT-1)
-                y = self.map_touch(4095-y_raw, Y_MIN, Y_MAX, 0, LCD_WIDTH-1)
-            elif(self.orientation == 270):
-                x = self.map_touch(y_raw, Y_MIN, Y_MAX, 0, LCD_WIDTH-1)
-                y = self.map_touch(4095-x_raw, X_MIN, X_MAX, 0, LCD_HEIGHT-1)
-
-
-            self.touch_cs_disable()
-            
-            #Returning SPI configuration to that for display
-            self.spi = SPI(self.spi_id, baudrate=DISPLAY_SPI_SPEED,
-                          sck = self.sck,
-                          mosi = self.mosi,
-                          miso = self.miso)
-            
-            return (x, y) 
-    
-    def setOrientation(self, orientation):
-        if(orientation == 0):
-            self.wr_cmd(MEMORY_ACCESS_CONTROL, 0x08) 
-            self.width = LCD_HEIGHT
-            self.height = LCD_WIDTH
-        elif(orientation == 90):
-            self.wr_cmd(MEMORY_ACCESS_CONTROL, 0xA8) 
-            self.width = LCD_WIDTH
-            self.height = LCD_HEIGHT
-        elif(orientation == 180):
-            self.wr_cmd(MEMORY_ACCESS_CONTROL, 0xC8) 
-            self.width = LCD_HEIGHT
-            self.height = LCD_WIDTH
-        elif(orientation == 270):
-            self.wr_cmd(MEMORY_ACCESS_CONTROL, 0x68) 
-            self.width = LCD_WIDTH
-            self.height = LCD_HEIGHT
-        else:
-            raise ValueError("Orientation can only be 0, 90, 180 and 270")
-        self.orientation = orientation
-    
-    def reset(self):
-        self.display_cs_disable()
-        
-        self.rst_enable()
-        time.sleep_ms(50)
-        self.rst_disable()
-        time.sleep_ms(120)
-
-        #Initial setup commands
-        
-        #driving ability
-        self.wr_cmd(POWER_CONTROL_INTERNAL_USE_1, 0x00) 
-        self.wr_cmd(POWER_CONTROL_INTERNAL_USE_2, 0x20) 
-        self.wr_cmd(SOURCE_CONTROL_INTERNAL_USE_1, 0x0C) 
-        self.wr_cmd(SOURCE_CONTROL_INTERNAL_USE_2, 0xC4) 
-        self.wr_cmd(SOURCE_OP_CONTROL_NORMAL, 0x40) 
-        self.wr_cmd(SOURCE_OP_CONTROL_IDLE, 0x38) 
-        self.wr_cmd(0xF1, 0x01) 
-        self.wr_cmd(0xF2, 0x10) 
-        self.wr_cmd(DISPLAY_CONTROL_2, 0xA3)
-        #power voltage
-        self.wr_cmd(POWER_CONTROL_2, 0x1B)
-        self.wr_cmd(POWER_CONTROL_1, 0x01)
-        self.wr_cmd(VCOM_CONTROL_2, 0x2F)
-        self.wr_cmd(VCOM_CONTROL_3, 0x57)
-        #VCOM offset
-        self.wr_cmd(VCOM_CONTROL_1, 0x8D)
-        #power on
-        self.wr_cmd(OSC_CONTROL_2, 0x36)
-        #start osc
-        self.wr_cmd(OSC_CONTROL_1, 0x01)
-        #wakeup
-        self.wr_cmd(DISPLAY_MODE_CONTROL, 0x00)
-        self.wr_cmd(POWER_CONTROL_6, 0x88)
-        time.sleep_ms(5)
-        self.wr_cmd(POWER_CONTROL_6, 0x80)
-        time.sleep_ms(5)
-        self.wr_cmd(POWER_CONTROL_6, 0x90)
-        time.sleep_ms(5)
-        self.wr_cmd(POWER_CONTROL_6, 0xD0)
-        time.sleep_ms(5)
-        #color selection
-        self.wr_cmd(COLMOD, 0x05) #0x05=65k, 0x06=262k
-        #panel characteristic
-        self.wr_cmd(PANEL_CHARACTERISTIC, 0x00)
-        #display options
-        self.wr_cmd(MEMORY_ACCESS_CONTROL, 0xA8) # 0xA8 RGB, 0xA0 BGR (even though datasheet says otherwise)
-        self.wr_cmd(COLUMN_ADDRESS_START_1, 0x00) #x0
-        self.wr_cmd(COLUMN_ADDRESS_START_2, 0x00) #x0
-        self.wr_cmd(COLUMN_ADDRESS_END_1, ((LCD_WIDTH-1)>>0)&0xFF)
-        self.wr_cmd(COLUMN_ADDRESS_END_2, ((LCD_WIDTH-1)>>8)&0xFF)
-        self.wr_cmd(ROW_ADDRESS_START_1, 0x00) #y0
-        self.wr_cmd(ROW_ADDRESS_START_2, 0x00) #y0
-        self.wr_cmd(ROW_ADDRESS_END_1, ((LCD_HEIGHT-1)>>0)&0xFF)
-        self.wr_cmd(ROW_ADDRESS_END_2, ((LCD_HEIGHT-1)>>8)&0xFF)
-        #display on
-        self.wr_cmd(DISPLAY_CONTROL_3, 0x38)
-        time.sleep_ms(50)
-        self.wr_cmd(DISPLAY_CONTROL_3, 0x3C)
-        time.sleep_ms(5)
-        
-    def wr_cmd(self, cmd, param):
-       self.display_cs_enable();
-       self.wr_spi(LCD_REGISTER);
-       self.wr_spi(cmd);
-       self.display_cs_disable();
-
-       self.display_cs_enable();
-       self.wr_spi(LCD_DATA);
-       self.wr_spi(param);
-       self.display_cs_disable();
-
-    def rd_spi(self, num_of_bytes):
-        #reads bytes from SPI in big endian format
-        return int.from_bytes(self.spi.read(num_of_bytes), "big")
-
-    def wr_spi(self, data):
-        #important that data is wrapped with []
-        self.spi.write(bytes([data]))
-        
-    def wr_buf_spi(self, buf):
-        self.spi.write(buf)
+        touch_read() of the core, holding the bus lock while the flush thread exists. Without a press
+        (pen interrupt idle) the lock isn't taken
+        """
+        if self.bus_lock == None or self.touch_cs == None or self.touch_idle():
+            return super().touch_read()
+        self.bus_lock.acquire()
+        try:
+            return super().touch_read()
+        finally:
+            self.bus_lock.release()
 
-    def map_touch(self, value, min_value_in, max_value_in, min_value_out, max_value_out):
-        return int((value - min_value_in) * (max_value_out - min_value_out) / (max_value_in - min_value_in) + min_value_out)
+    def touch_sample(self):
+        """
+        Reads the touch screen controller, the caller has to make sure the SPI bus is free
+        """
+        self.touch_ms = time.ticks_ms()
+        return super().touch_sample()
 
@@ -0,0 +1,628 @@
+"""
+Simulated hardware for running the MI0283QT2 drivers without a board, under CPython or the MicroPython unix port
+
+SimPin and SimSPI have the interface of machine.Pin and machine.SPI. HX8347 decodes the register and data byte
+stream of the display into registers and a GRAM image, XPT2046 answers conversions with scripted touch samples.
+Board wires them together like on the real board and gives the arguments for the driver constructors:
+
+    import MI0283QT2_sim as sim
+    sim.install()
+    from MI0283QT2 import MI0283QT2
+
+    board = sim.Board(touch_irq=True)
+    disp = MI0283QT2(**board.args())
+    disp.fill(0xF800)
+    board.panel.pixel(0, 0) #0xF800
+    board.touch.press(2000, 2000)
+    disp.touch_read()
+
+install() provides the modules the drivers import (micropython, framebuf) and the MicroPython time functions
+when they are missing, it has to be called before the drivers are imported.
+"""
+import sys
+
+#Prefix bytes of the display SPI interface
+HX_REGISTER = 0x70
+HX_DATA = 0x72
+#Register index of GRAM write
+HX_GRAM = 0x22
+HX_MEMORY_ACCESS_CONTROL = 0x16
+HX_DISPLAY_MODE_CONTROL = 0x01
+#Bit of display mode control that turns vertical scrolling on
+HX_SCROLL_ON = 0x08
+#Bits of the memory access control register
+HX_MY = 0x80
+HX_MX = 0x40
+HX_MV = 0x20
+
+#Physical size of the panel
+PANEL_WIDTH = 240
+PANEL_HEIGHT = 320
+
+#Raw pressure readings of the touch screen controller
+TOUCH_Z1 = 400
+TOUCH_Z2 = 3000
+
+class SimPin(object):
+    """
+    Pin with the machine.Pin interface. Devices listen to changes of their pins with listen()
+    """
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    def __init__(self, name=None, value=1):
+        self.name = name
+        self.val = value
+        self.mode = self.IN
+        self.handler = None
+        self.trigger = 0
+        self.listeners = []
+
+    def init(self, mode=-1, pull=-1, value=None):
+        if mode != -1:
+            self.mode = mode
+        if value != None:
+            self.value(value)
+
+    def value(self, v=None):
+        if v == None:
+            return self.val
+        v = 1 if v else 0
+        if v == self.val:
+            return
+        self.val = v
+        for listener in self.listeners:
+            listener(v)
+        if self.handler != None and self.trigger & (self.IRQ_RISING if v else self.IRQ_FALLING):
+            self.handler(self)
+
+    def __call__(self, v=None):
+        return self.value(v)
+
+    def high(self):
+        self.value(1)
+
+    def low(self):
+        self.value(0)
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING):
+        self.handler = handler
+        self.trigger = trigger
+
+    def listen(self, listener):
+        self.listeners.append(listener)
+
+class SimSPI(object):
+    """
+    SPI bus with the machine.SPI interface. Every byte is sent to the device whose chip select is low,
+    its answer is the byte read. Counts transfers and bytes, and transfers with more than one device selected
+    """
+    def __init__(self, spi_id=0, baudrate=1000000, **kwargs):
+        self.spi_id = spi_id
+        self.baudrate = baudrate
+        self.devices = [] #[cs, device]
+        self.inits = 0
+        self.transfers = 0
+        self.bytes = 0
+        self.conflicts = 0
+
+    def __repr__(self):
+        return "SimSPI(%d, baudrate=%d)" % (self.spi_id, self.baudrate)
+
+    def attach(self, device, cs):
+        self.devices.append([cs, device])
+
+    def init(self, baudrate=None, **kwargs):
+        if baudrate != None:
+            self.baudrate = baudrate
+        self.inits += 1
+
+    def deinit(self):
+        pass
+
+    def selected(self):
+        device = None
+        for cs, d in self.devices:
+            if cs.value() == 0:
+                if device != None:
+                    self.conflicts += 1
+                device = d
+        return device
+
+    def transfer(self, tx, rx, write=0):
+        """
+        Sends bytes of tx (or write when tx is None) and stores the answers in rx if it is given
+        """
+        device = self.selected()
+        n = len(tx) if tx != None else len(rx)
+        self.transfers += 1
+        self.bytes += n
+        for i in range(n):
+            b = tx[i] if tx != None else write
+            r = device.exchange(b) if device != None else 0xFF
+            if rx != None:
+                rx[i] = r
+
+    def write(self, buf):
+        self.transfer(buf, None)
+
+    def readinto(self, buf, write=0):
+        self.transfer(None, buf, write)
+
+    def read(self, nbytes, write=0):
+        buf = bytearray(nbytes)
+        self.transfer(None, buf, write)
+        return bytes(buf)
+
+    def write_readinto(self, write_buf, read_buf):
+        self.transfer(write_buf, read_buf)
+
+class HX8347(object):
+    """
+    HX8347-D display controller. Decodes the byte stream into registers and GRAM, the window and
+    memory access control registers are applied to GRAM writes like in the controller.
+    Pixels are RGB565 values, pixel() reads them in the current orientation and
+    physical_pixel() in the orientation of the panel. shown_pixel() reads the pixel shown at a position,
+    it differs from pixel() when vertical scrolling is on
+    """
+    def __init__(self, cs, rst=None):
+        self.regs = bytearray(256)
+        self.gram = bytearray(PANEL_WIDTH * PANEL_HEIGHT * 2)
+        self.prefix = -1
+        self.index = 0
+        self.x = 0
+        self.y = 0
+        self.high = -1 #first byte of a pixel
+        cs.listen(self.cs_changed)
+        if rst != None:
+            rst.listen(self.rst_changed)
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.cs_cycles = 0
+        self.index_writes = 0
+        self.register_writes = 0
+        self.gram_writes = 0
+        self.pixels = 0
+        self.errors = 0
+
+    def cs_changed(self, value):
+        if value == 0:
+            self.cs_cycles += 1
+        self.prefix = -1
+        self.high = -1
+
+    def rst_changed(self, value):
+        if value == 0:
+            for i in range(len(self.regs)):
+                self.regs[i] = 0
+
+    def exchange(self, b):
+        if self.prefix == -1:
+            if b != HX_REGISTER and b != HX_DATA:
+                self.errors += 1
+            self.prefix = b
+        elif self.prefix == HX_REGISTER:
+            self.index = b
+            self.index_writes += 1
+            if b == HX_GRAM:
+                #GRAM write starts at the start of the window
+                self.gram_writes += 1
+                self.x = self.window()[0]
+                self.y = self.window()[1]
+                self.high = -1
+        elif self.prefix == HX_DATA:
+            if self.index == HX_GRAM:
+                self.write_gram(b)
+            else:
+                self.regs[self.index] = b
+                self.register_writes += 1
+        return 0
+
+    def window(self):
+        """
+        Returns (x0, y0, x1, y1) of the window set in the registers
+        """
+        r = self.regs
+        return ((r[0x02] << 8) | r[0x03], (r[0x06] << 8) | r[0x07],
+                (r[0x04] << 8) | r[0x05], (r[0x08] << 8) | r[0x09])
+
+    def size(self):
+        """
+        Returns (width, height) in the current orientation
+        """
+        if self.regs[HX_MEMORY_ACCESS_CONTROL] & HX_MV:
+            return (PANEL_HEIGHT, PANEL_WIDTH)
+        return (PANEL_WIDTH, PANEL_HEIGHT)
+
+    def gram_offset(self, x, y):
+        """
+        Returns offset in GRAM of pixel (x, y) in the current orientation, or -1 if it is outside
+        """
+        mac = self.regs[HX_MEMORY_ACCESS_CONTROL]
+        if mac & HX_MV:
+            x, y = y, x
+        if mac & HX_MX:
+            x = PANEL_WIDTH - 1 - x
+        if mac & HX_MY:
+            y = PANEL_HEIGHT - 1 - y
+        if x < 0 or y < 0 or x >= PANEL_WIDTH or y >= PANEL_HEIGHT:
+            return -1
+        return (y * PANEL_WIDTH + x) * 2
+
+    def write_gram(self, b):
+        if self.high == -1:
+            self.high = b
+            return
+        offset = self.gram_offset(self.x, self.y)
+        if offset >= 0:
+            self.gram[offset] = self.high
+            self.gram[offset + 1] = b
+        else:
+            self.errors += 1
+        self.high = -1
+        self.pixels += 1
+
+        #Address counter moves along the row and wraps to the start of the window
+        x0, y0, x1, y1 = self.window()
+        self.x += 1
+        if self.x > x1:
+            self.x = x0
+            self.y += 1
+            if self.y > y1:
+                self.y = y0
+
+    def pixel(self, x, y):
+        offset = self.gram_offset(x, y)
+        return (self.gram[offset] << 8) | self.gram[offset + 1]
+
+    def shown_pixel(self, x, y):
+        offset = self.gram_offset(x, y)
+        r = self.regs
+        if r[HX_DISPLAY_MODE_CONTROL] & HX_SCROLL_ON:
+            #Panel row p of the scroll area shows memory row top + (p - top + start - top) % height
+            top = (r[0x0E] << 8) | r[0x0F]
+            height = (r[0x10] << 8) | r[0x11]
+            start = (r[0x14] << 8) | r[0x15]
+            row = offset // (PANEL_WIDTH * 2)
+            if height and row >= top and row < top + height:
+                row = top + (row - top + start - top) % height
+                offset = row * PANEL_WIDTH * 2 + offset % (PANEL_WIDTH * 2)
+        return (self.gram[offset] << 8) | self.gram[offset + 1]
+
+    def physical_pixel(self, x, y):
+        offset = (y * PANEL_WIDTH + x) * 2
+        return (self.gram[offset] << 8) | self.gram[offset + 1]
+
+    def region(self, x, y, w, h):
+        """
+        Returns pixels of a region in the current orientation as a list of rows
+        """
+        return [[self.pixel(x + i, y + j) for i in range(w)] for j in range(h)]
+
+    def save_ppm(self, path):
+        """
+        Saves the screen as it is shown in the current orientation as a binary PPM image
+        """
+        width, height = self.size()
+        data = bytearray(width * height * 3)
+        i = 0
+        for y in range(height):
+            for x in range(width):
+                c = self.shown_pixel(x, y)
+                data[i] = (c >> 8) & 0xF8
+                data[i + 1] = (c >> 3) & 0xFC
+                data[i + 2] = (c << 3) & 0xF8
+                i += 3
+        with open(path, "wb") as f:
+            f.write(("P6\n%d %d\n255\n" % (width, height)).encode())
+            f.write(data)
+
+class XPT2046(object):
+    """
+    XPT2046 touch screen controller in 16 clocks per conversion mode, the result of a conversion is sent in the
+    two bytes after its command. The touch is set with press() and release() or scripted with script(),
+    one scripted sample is used for every chip select assertion. Readings are raw 12 bit values.
+    PENIRQ is low while the screen is pressed and the controller is in power down mode
+    """
+    def __init__(self, cs, penirq=None):
+        self.penirq = penirq
+        self.pressed = False
+        self.x = 0
+        self.y = 0
+        self.z1 = 0
+        self.z2 = 4095
+        self.power_down = True
+        self.pending = []
+        self.samples = []
+        cs.listen(self.cs_changed)
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.transactions = 0
+        self.conversions = 0
+
+    def press(self, x, y, z1=TOUCH_Z1, z2=TOUCH_Z2):
+        self.pressed = True
+        self.x = x
+        self.y = y
+        self.z1 = z1
+        self.z2 = z2
+        self.update_penirq()
+
+    def release(self):
+        self.pressed = False
+        self.z1 = 0
+        self.z2 = 4095
+        self.update_penirq()
+
+    def script(self, samples):
+        """
+        Queues samples, (x, y) raw reading of a press or None for release
+        """
+        self.samples += samples
+
+    def cs_changed(self, value):
+        self.pending = []
+        if value == 0:
+            self.transactions += 1
+            if self.samples:
+                sample = self.samples.pop(0)
+                if sample == None:
+                    self.release()
+                else:
+                    self.press(sample[0], sample[1])
+
+    def update_penirq(self):
+        if self.penirq != None:
+            self.penirq.value(0 if self.pressed and self.power_down else 1)
+
+    def exchange(self, b):
+        r = self.pending.pop(0) if self.pending else 0
+        if b & 0x80:
+            channel = (b >> 4) & 0x07
+            if channel == 5:
+                value = self.x
+            elif channel == 1:
+                value = self.y
+            elif channel == 3:
+                value = self.z1
+            elif channel == 4:
+                value = self.z2
+            else:
+                value = 0
+            value = (value & 0xFFF) << 3
+            self.pending = [value >> 8, value & 0xFF]
+            self.conversions += 1
+            self.power_down = (b & 0x03) == 0
+            self.update_penirq()
+        return r
+
+class Board(object):
+    """
+    Simulated board, the display and the touch screen controller on one SPI bus
+    """
+    def __init__(self, touch=True, touch_irq=False):
+        #imported here, so install() can be called after importing this module
+        from MI0283QT2_bus import SPIBus
+
+        self.spi = SimSPI(0)
+        self.rst = SimPin("rst")
+        self.led = SimPin("led", 0)
+        self.display_cs = SimPin("display_cs")
+        self.panel = HX8347(self.display_cs, self.rst)
+        self.spi.attach(self.panel, self.display_cs)
+
+        self.touch_cs = None
+        self.touch_irq = None
+        self.touch = None
+        if touch:
+            self.touch_cs = SimPin("touch_cs")
+            if touch_irq:
+                self.touch_irq = SimPin("touch_irq")
+            self.touch = XPT2046(self.touch_cs, self.touch_irq)
+            self.spi.attach(self.touch, self.touch_cs)
+
+        self.bus = SPIBus(0, None, None, None, self.spi.baudrate, spi=self.spi)
+
+    def args(self):
+        """
+        Returns keyword arguments for the driver constructors
+        """
+        return {"spi_id": 0, "sck": None, "mosi": None, "miso": None, "rst": self.rst, "led": self.led,
+                "display_cs": self.display_cs, "touch_cs": self.touch_cs, "bus": self.bus,
+                "touch_irq": self.touch_irq}
+
+    def reset_counters(self):
+        self.spi.transfers = 0
+        self.spi.bytes = 0
+        self.spi.inits = 0
+        self.spi.conflicts = 0
+        self.panel.reset_counters()
+        if self.touch != None:
+            self.touch.reset_counters()
+
+class FrameBuffer(object):
+    """
+    Minimal framebuf.FrameBuffer for CPython, RGB565, GS8, GS4_HMSB and MONO_HLSB. Pixels are stored like in
+    MicroPython, RGB565 little endian, GS4 with the first pixel in the high nibble and MONO_HLSB with the first
+    pixel in the highest bit
+    """
+    def __init__(self, buf, width, height, format, stride=None):
+        if format != RGB565 and format != GS8 and format != GS4_HMSB and format != MONO_HLSB:
+            raise ValueError("Only RGB565, GS8, GS4_HMSB and MONO_HLSB are simulated")
+        self.buf = buf
+        self.width = width
+        self.height = height
+        self.format = format
+        self.stride = stride if stride != None else width
+        if format == MONO_HLSB:
+            self.stride = (self.stride + 7) & ~7
+
+    def pixel(self, x, y, c=None):
+        if x < 0 or y < 0 or x >= self.width or y >= self.height:
+            return None
+        if self.format == GS8:
+            i = y * self.stride + x
+            if c == None:
+                return self.buf[i]
+            self.buf[i] = c & 0xFF
+        elif self.format == MONO_HLSB:
+            i = (y * self.stride + x) >> 3
+            shift = 7 - (x & 7)
+            if c == None:
+                return (self.buf[i] >> shift) & 1
+            self.buf[i] = (self.buf[i] & ~(1 << shift)) | ((c & 1) << shift)
+        elif self.format == GS4_HMSB:
+            i = (y * self.stride + x) >> 1
+            shift = 0 if x & 1 else 4
+            if c == None:
+                return (self.buf[i] >> shift) & 0x0F
+            self.buf[i] = (self.buf[i] & ~(0x0F << shift)) | ((c & 0x0F) << shift)
+        else:
+            i = (y * self.stride + x) * 2
+            if c == None:
+                return self.buf[i] | (self.buf[i + 1] << 8)
+            self.buf[i] = c & 0xFF
+            self.buf[i + 1] = (c >> 8) & 0xFF
+
+    def fill_rect(self, x, y, w, h, c):
+        x0 = max(x, 0)
+        y0 = max(y, 0)
+        x1 = min(x + w, self.width)
+        y1 = min(y + h, self.height)
+        if x0 >= x1:
+            return
+        if self.format != RGB565:
+            for j in range(y0, y1):
+                for i in range(x0, x1):
+                    self.pixel(i, j, c)
+            return
+        row = bytes((c & 0xFF, (c >> 8) & 0xFF)) * (x1 - x0)
+        for j in range(y0, y1):
+            i = (j * self.stride + x0) * 2
+            self.buf[i:i + len(row)] = row
+
+    def fill(self, c):
+        self.fill_rect(0, 0, self.width, self.height, c)
+
+    def hline(self, x, y, w, c):
+        self.fill_rect(x, y, w, 1, c)
+
+    def vline(self, x, y, h, c):
+        self.fill_rect(x, y, 1, h, c)
+
+    def rect(self, x, y, w, h, c, fill=False):
+        if fill:
+            self.fill_rect(x, y, w, h, c)
+            return
+        self.hline(x, y, w, c)
+        self.hline(x, y + h - 1, w, c)
+        self.vline(x, y, h, c)
+        self.vline(x + w - 1, y, h, c)
+
+    def text(self, s, x, y, c=1):
+        """
+        Draws s with 8x8 placeholder glyphs instead of the MicroPython font: rows 1 to 6 of a character show the
+        bits of its code, lowest bit in the first column, so drawn text can be decoded. Spaces draw nothing
+        """
+        for ch in s:
+            code = ord(ch) & 0xFF
+            if code != 0x20:
+                for i in range(8):
+                    if (code >> i) & 1:
+                        self.fill_rect(x + i, y + 1, 1, 6, c)
+            x += 8
+
+    def blit(self, fbuf, x, y, key=-1, palette=None):
+        """
+        Copies fbuf to (x, y), a palette framebuffer maps source pixels to colors, pixels of color key are skipped
+        """
+        for j in range(max(-y, 0), min(fbuf.height, self.height - y)):
+            for i in range(max(-x, 0), min(fbuf.width, self.width - x)):
+                c = fbuf.pixel(i, j)
+                if palette != None:
+                    c = palette.pixel(c, 0)
+                if c != key:
+                    self.pixel(x + i, y + j, c)
+
+class ThreadSafeFlag(object):
+    """
+    asyncio.ThreadSafeFlag for CPython. set() can be called from any thread, like from the flush thread of the
+    LVGL driver, wait() polls the flag every millisecond
+    """
+    def __init__(self):
+        self.state = False
+
+    def set(self):
+        self.state = True
+
+    def clear(self):
+        self.state = False
+
+    async def wait(self):
+        import asyncio
+        while not self.state:
+            await asyncio.sleep(0.001)
+        self.state = False
+
+#framebuf format constants
+MONO_VLSB = 0
+RGB565 = 1
+GS4_HMSB = 2
+MONO_HLSB = 3
+MONO_HMSB = 4
+GS2_HMSB = 5
+GS8 = 6
+
+def new_module(name):
+    module = type(sys)(name)
+    sys.modules[name] = module
+    return module
+
+def install():
+    """
+    Provides micropython.const and micropython.native, framebuf and the MicroPython functions of time and asyncio
+    when they are missing, so the drivers can be imported under CPython. Under the MicroPython unix port nothing
+    has to be added
+    """
+    try:
+        import micropython
+    except ImportError:
+        micropython = new_module("micropython")
+        micropython.const = lambda value: value
+        micropython.native = lambda function: function
+
+    try:
+        import framebuf
+    except ImportError:
+        framebuf = new_module("framebuf")
+        framebuf.FrameBuffer = FrameBuffer
+        for name in ("MONO_VLSB", "RGB565", "GS4_HMSB", "MONO_HLSB", "MONO_HMSB", "GS2_HMSB", "GS8"):
+            setattr(framebuf, name, globals()[name])
+
+    import time
+    if not hasattr(time, "ticks_ms"):
+        time.sleep_ms = lambda ms: time.sleep(ms / 1000)
+        time.sleep_us = lambda us: time.sleep(us / 1000000)
+        time.ticks_ms = lambda: int(time.perf_counter() * 1000)
+        time.ticks_us = lambda: int(time.perf_counter() * 1000000)
+        time.ticks_add = lambda ticks, delta: ticks + delta
+        time.ticks_diff = lambda ticks1, ticks2: ticks1 - ticks2
+
+    import asyncio
+    if not hasattr(asyncio, "sleep_ms"):
+        asyncio.sleep_ms = lambda ms: asyncio.sleep(ms / 1000)
+        asyncio.wait_for_ms = lambda awaitable, ms: asyncio.wait_for(awaitable, ms / 1000)
+        asyncio.ThreadSafeFlag = ThreadSafeFlag
@@ -0,0 +1,156 @@
+"""
+Sprite atlas for the MI0283QT2 drivers. Atlas files are made by tools/make_atlas.py, sprites are drawn with
+draw_stream() directly on the screen, without a framebuffer.
+
+    atlas = SpriteAtlas("icons.atlas")
+    atlas.draw(disp, "wifi", 200, 4)
+
+Atlas file format, numbers are little endian:
+    "SPRA", version (1 byte), number of sprites (2 bytes)
+    for every sprite: name length (1 byte), name, width (2 bytes), height (2 bytes), flags (1 byte),
+                      offset of the data in the file (4 bytes), size of the data (4 bytes)
+    sprite data, big endian RGB565 pixels (byte order of the display)
+RLE sprites (flag 1) encode every row on its own as packets. Header byte n with the highest bit set is a run,
+(n & 0x7F) + 1 pixels of the color in the next two bytes. Otherwise it is followed by n + 1 literal pixels.
+"""
+from micropython import const
+from MI0283QT2_image import read_u16, read_u32, LRUCache
+
+_ATLAS_VERSION = const(1)
+_FLAG_RLE = const(1)
+#Longest RLE packet, header and 128 literal pixels
+_MAX_PACKET = const(257)
+#Size of the buffer encoded data is read into
+_IN_BUF_SIZE = const(512)
+
+class SpriteAtlas(object):
+    """
+    Reads sprites of an atlas file when they are drawn. Decoded sprites are kept in an LRU cache of at most
+    cache_bytes bytes, sprites larger than it are streamed from the file every time they are drawn, rows rows
+    at a time. Sprites are opaque rectangles
+    """
+    def __init__(self, path, cache_bytes=8192, rows=8):
+        self.f = open(path, "rb")
+        header = self.f.read(7)
+        if header[0:4] != b"SPRA" or header[4] != _ATLAS_VERSION:
+            raise ValueError("Not a sprite atlas file")
+        count = read_u16(header, 5)
+
+        self.index = {} #name: [width, height, flags, offset, size]
+        max_width = 1
+        for i in range(count):
+            name_len = self.f.read(1)[0]
+            name = self.f.read(name_len).decode()
+            entry = self.f.read(13)
+            sprite = [read_u16(entry, 0), read_u16(entry, 2), entry[4], read_u32(entry, 5), read_u32(entry, 9)]
+            self.index[name] = sprite
+            max_width = max(max_width, sprite[0])
+
+        self.cache = LRUCache(cache_bytes) #name: decoded pixels
+
+        self.rows = rows
+        self.line_buf = bytearray(max_width * 2 * rows)
+        self.line_mv = memoryview(self.line_buf)
+        self.in_buf = bytearray(_IN_BUF_SIZE)
+        self.in_mv = memoryview(self.in_buf)
+
+    def close(self):
+        self.f.close()
+
+    def names(self):
+        return list(self.index.keys())
+
+    def size(self, name):
+        sprite = self.index[name]
+        return (sprite[0], sprite[1])
+
+    def draw(self, display, name, x, y):
+        """
+        Draws sprite with its top left corner at (x, y)
+        """
+        sprite = self.index[name]
+        width = sprite[0]
+        height = sprite[1]
+        pixels = self.cache.get(name)
+        if pixels == None:
+            if width * height * 2 > self.cache.max_bytes:
+                #Too large for the cache, streamed from the file
+                display.draw_stream(x, y, width, height, self.read_rows(sprite))
+                return
+            pixels = self.load(name)
+        display.draw_stream(x, y, width, height, (pixels,))
+
+    def load(self, name):
+        """
+        Decodes sprite into the cache, least recently used sprites are removed to make room for it
+        """
+        sprite = self.index[name]
+        size = sprite[0] * sprite[1] * 2
+        #Room is made before the allocation, so the memory of removed sprites can be reused
+        self.cache.make_room(size)
+        pixels = bytearray(size)
+        pos = 0
+        for rows in self.read_rows(sprite):
+            pixels[pos:pos + len(rows)] = rows
+            pos += len(rows)
+        self.cache.add(name, pixels, size)
+        return pixels
+
+    def clear_cache(self):
+        self.cache.clear()
+
+    def read_rows(self, sprite):
+        """
+        Reads sprite from the file, gives buffers of up to rows rows. The buffer is reused
+        """
+        width, height, flags, offset, size = sprite
+        row_size = width * 2
+        self.f.seek(offset)
+        if not flags & _FLAG_RLE:
+            row = 0
+            while row < height:
+                n = min(self.rows, height - row)
+                self.f.readinto(self.line_mv[:n * row_size])
+                yield self.line_mv[:n * row_size]
+                row += n
+            return
+
+        buf = self.in_buf
+        mv = self.in_mv
+        line = self.line_mv
+        end = self.f.readinto(mv[:min(size, _IN_BUF_SIZE)])
+        left = size - end #encoded bytes not read yet
+        pos = 0
+        row = 0
+        while row < height:
+            n = min(self.rows, height - row)
+            out = 0
+            rows_end = n * row_size
+            while out < rows_end:
+                if(end - pos < _MAX_PACKET and left):
+                    #Unread rest of the buffer is moved to its start and the buffer is refilled
+                    remaining = end - pos
+                    buf[0:remaining] = buf[pos:end]
+                    got = self.f.readinto(mv[remaining:remaining + min(left, _IN_BUF_SIZE - remaining)])
+                    left -= got
+                    end = remaining + got
+                    pos = 0
+                header = buf[pos]
+                if header & 0x80:
+                    count = ((header & 0x7F) + 1) * 2
+                    line[out] = buf[pos + 1]
+                    line[out + 1] = buf[pos + 2]
+                    #Run is expanded from its first pixel, every copy doubles the part already written
+                    k = 2
+                    while k < count:
+                        m = min(k, count - k)
+                        line[out + k:out + k + m] = line[out:out + m]
+                        k += m
+                    pos += 3
+                else:
+                    count = (header + 1) * 2
+                    line[out:out + count] = mv[pos + 1:pos + 1 + count]
+                    pos += 1 + count
+                out += count
+            yield line[:rows_end]
+            row += n
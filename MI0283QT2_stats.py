@@ -0,0 +1,129 @@
+import time
+
+class Stats(object):
+    """
+    Bus counters of one driver, created by enable_stats() of the drivers. The SPI object and chip select pins
+    of the driver are replaced with counting proxies and the measured methods with timing wrappers.
+    Nothing of it exists while stats are disabled, so they cost nothing then
+    """
+    def __init__(self, driver):
+        self.display_cs = StatsPin(driver.display_cs)
+        self.touch_cs = StatsPin(driver.touch_cs) if driver.touch_cs != None else None
+        self.spi = StatsSPI(driver.spi, self.display_cs)
+        self.calls = {} #name: [calls, time in us]
+        self.pixel_bytes = 0
+
+    def wrap(self, obj, key, name):
+        """
+        Replaces method name of obj with a wrapper counting calls and time spent in it under key
+        """
+        method = getattr(obj, name)
+        entry = self.calls.get(key)
+        if entry == None:
+            entry = [0, 0]
+            self.calls[key] = entry
+        ticks_us = time.ticks_us
+        ticks_diff = time.ticks_diff
+        def timed(*args):
+            start = ticks_us()
+            try:
+                return method(*args)
+            finally:
+                entry[0] += 1
+                entry[1] += ticks_diff(ticks_us(), start)
+        setattr(obj, name, timed)
+
+    def count_pixels(self, driver):
+        """
+        Replaces wr_buf_spi() of driver, which sends all pixel data, with a wrapper counting the sent bytes
+        """
+        method = driver.wr_buf_spi
+        def counted(buf):
+            self.pixel_bytes += len(buf)
+            method(buf)
+        driver.wr_buf_spi = counted
+
+    def reset(self):
+        self.spi.transfers = 0
+        self.spi.bytes = 0
+        self.spi.display_bytes = 0
+        self.pixel_bytes = 0
+        self.display_cs.assertions = 0
+        if self.touch_cs != None:
+            self.touch_cs.assertions = 0
+        for entry in self.calls.values():
+            entry[0] = 0
+            entry[1] = 0
+
+    def result(self):
+        result = {"transfers": self.spi.transfers, "bytes": self.spi.bytes, "pixel_bytes": self.pixel_bytes,
+                  "command_bytes": self.spi.display_bytes - self.pixel_bytes,
+                  "display_cs": self.display_cs.assertions,
+                  "touch_cs": self.touch_cs.assertions if self.touch_cs != None else 0}
+        for key in self.calls:
+            result[key] = tuple(self.calls[key])
+        return result
+
+class StatsSPI(object):
+    """
+    SPI proxy counting transfers and bytes, bytes written while display_cs is asserted are also counted separately
+    """
+    def __init__(self, spi, display_cs):
+        self.spi = spi
+        self.display_cs = display_cs
+        self.transfers = 0
+        self.bytes = 0
+        self.display_bytes = 0
+
+    def init(self, **kwargs):
+        self.spi.init(**kwargs)
+
+    def write(self, buf):
+        self.transfers += 1
+        self.bytes += len(buf)
+        if self.display_cs.active:
+            self.display_bytes += len(buf)
+        self.spi.write(buf)
+
+    def readinto(self, buf, write=0):
+        self.transfers += 1
+        self.bytes += len(buf)
+        self.spi.readinto(buf, write)
+
+    def read(self, nbytes, write=0):
+        self.transfers += 1
+        self.bytes += nbytes
+        return self.spi.read(nbytes, write)
+
+    def write_readinto(self, write_buf, read_buf):
+        self.transfers += 1
+        self.bytes += len(write_buf)
+        self.spi.write_readinto(write_buf, read_buf)
+
+class StatsPin(object):
+    """
+    Chip select pin proxy counting assertions (changes to low), active is True while the pin is low
+    """
+    def __init__(self, pin):
+        self.pin = pin
+        self.assertions = 0
+        self.active = False
+
+    def __call__(self, v=None):
+        if v != None:
+            self.active = not v
+            if not v:
+                self.assertions += 1
+        return self.pin(v) if v != None else self.pin()
+
+    def value(self, v=None):
+        return self(v)
+
+    def low(self):
+        self.assertions += 1
+        self.active = True
+        self.pin.low()
+
+    def high(self):
+        self.active = False
+        self.pin.high()
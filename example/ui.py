@@ -1,6 +1,7 @@
 import lvgl as lv
-from machine import Pin, ADC, Timer, PWM
+from machine import Pin, ADC, PWM
 from micropython import const
+import asyncio
 
 
 def map(val, in_min, in_max, out_min, out_max):
@@ -309,19 +310,21 @@ class analog_reading_screen(screen_with_home_button):
         sec.set_range(18, 20)
         sec.set_style(0, sec_style)
 
-        self.timer = Timer(mode=Timer.PERIODIC, period=40, callback=self.update_scale)
+        self.task = asyncio.create_task(self.update_scale())
         
 
     def show_screen(self):
         lv.screen_load_anim(self.screen, lv.SCR_LOAD_ANIM.OVER_BOTTOM, SCREEN_TRANSITION_TIME, 0, False)
 
-    def update_scale(self, timer):
-        sensor_reading = self.sensor.read_u16()
-        sensor_reading = map(sensor_reading, 0, 65535, 0, 20)
-        self.pressure_scale.set_line_needle_value(self.needle_line, 60, sensor_reading)
+    async def update_scale(self):
+        while True:
+            sensor_reading = self.sensor.read_u16()
+            sensor_reading = map(sensor_reading, 0, 65535, 0, 20)
+            self.pressure_scale.set_line_needle_value(self.needle_line, 60, sensor_reading)
+            await asyncio.sleep_ms(40)
 
     def clean_up(self, event):
-        self.timer.deinit()
+        self.task.cancel()
         
 class graphing_screen(screen_with_home_button):
 
@@ -357,17 +360,19 @@ class graphing_screen(screen_with_home_button):
         self.time_division_label.set_text("Sample time = 500ms")
         self.time_division_label.align_to(self.graph, lv.ALIGN.TOP_MID, 0, 0)
 
-        self.timer = Timer(mode=Timer.PERIODIC, period=500, callback=self.update_graph)
+        self.task = asyncio.create_task(self.update_graph())
 
     def show_screen(self):
         lv.screen_load_anim(self.screen, lv.SCR_LOAD_ANIM.OVER_BOTTOM, SCREEN_TRANSITION_TIME, 0, False)
     
-    def update_graph(self, event):
-        val = map(self.sensor.read_u16(), 0, 65535, 0, 10)
-        self.graph.set_next_value(self.graph_series, val)
+    async def update_graph(self):
+        while True:
+            val = map(self.sensor.read_u16(), 0, 65535, 0, 10)
+            self.graph.set_next_value(self.graph_series, val)
+            await asyncio.sleep_ms(500)
 
     def clean_up(self, event):
-        self.timer.deinit()
+        self.task.cancel()
 
 class analog_writing_screen(screen_with_home_button):
 
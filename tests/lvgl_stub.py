@@ -0,0 +1,253 @@
+"""
+Minimal stand-in for the lvgl module, with only what MI0283QT2_lvgl uses, so the LVGL driver can be checked on the
+simulated board (MI0283QT2_sim). It doesn't draw widgets: areas invalidated with invalidate() of the display are
+filled with a color and flushed by timer_handler() like LVGL does it, split into render buffer sized parts,
+waiting for flush_ready() before the next flush_cb. Input devices are read after the display is refreshed while
+their read timer isn't paused, every reading is kept in readings of the input device.
+
+    sys.modules["lvgl"] = lvgl_stub
+    disp = MI0283QT2_lvgl(**board.args())
+    disp.disp_drv.invalidate(0, 0, 239, 31, 0xF800)
+    disp.timer_handler()
+"""
+import time
+
+#Returned by timer_handler() when no timer is running
+NO_TIMER_READY = 0xFFFFFFFF
+#Period of the display refresh and input device read timers in ms
+TIMER_PERIOD = 30
+
+class COLOR_FORMAT(object):
+    RGB565 = 0x12
+    RGB565_SWAPPED = 0x1B
+
+class DISPLAY_RENDER_MODE(object):
+    PARTIAL = 0
+    DIRECT = 1
+    FULL = 2
+
+class INDEV_TYPE(object):
+    POINTER = 1
+
+class INDEV_STATE(object):
+    RELEASED = 0
+    PRESSED = 1
+
+initialized = False
+tick = 0
+displays = []
+indevs = []
+
+def is_initialized():
+    return initialized
+
+def init():
+    global initialized
+    initialized = True
+
+def tick_inc(ms):
+    global tick
+    tick += ms
+
+def tick_get():
+    return tick
+
+def draw_sw_rgb565_swap(data, count):
+    for i in range(0, count * 2, 2):
+        data[i], data[i + 1] = data[i + 1], data[i]
+
+class Area(object):
+    def __init__(self, x1, y1, x2, y2):
+        self.x1 = x1
+        self.y1 = y1
+        self.x2 = x2
+        self.y2 = y2
+
+class Pointer(object):
+    """
+    C pointer to a render buffer
+    """
+    def __init__(self, buf):
+        self.buf = buf
+
+    def __dereference__(self, size):
+        return memoryview(self.buf)[:size]
+
+class Display(object):
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.color_format = COLOR_FORMAT.RGB565
+        self.buffers = ()
+        self.buf_size = 0
+        self.render_mode = DISPLAY_RENDER_MODE.PARTIAL
+        self.flush_cb = None
+        self.flush_wait_cb = None
+        self.flushing = False
+        self.flushes = 0
+        self.invalid = [] #(x1, y1, x2, y2, color) waiting for the next refresh
+        self.buf_index = 0
+
+    def set_color_format(self, color_format):
+        self.color_format = color_format
+
+    def set_buffers(self, buf1, buf2, size, render_mode):
+        self.buffers = (buf1,) if buf2 == None else (buf1, buf2)
+        self.buf_size = size
+        self.render_mode = render_mode
+
+    def set_flush_cb(self, flush_cb):
+        self.flush_cb = flush_cb
+
+    def set_flush_wait_cb(self, flush_wait_cb):
+        self.flush_wait_cb = flush_wait_cb
+
+    def flush_ready(self):
+        self.flushing = False
+
+    def invalidate(self, x1, y1, x2, y2, color_rgb565):
+        """
+        Marks the area to be redrawn with color_rgb565 in the next refresh
+        """
+        self.invalid.append((x1, y1, x2, y2, color_rgb565))
+
+    def wait_for_flushing(self):
+        if self.flush_wait_cb != None:
+            self.flush_wait_cb(self)
+        while self.flushing:
+            time.sleep(0.0001)
+
+    def render(self, buf, offset, stride, width, rows, color_rgb565):
+        if self.color_format == COLOR_FORMAT.RGB565_SWAPPED:
+            pixel = bytes((color_rgb565 >> 8, color_rgb565 & 0xFF))
+        else:
+            pixel = bytes((color_rgb565 & 0xFF, color_rgb565 >> 8))
+        for i in range(rows):
+            buf[offset:offset + width * 2] = pixel * width
+            offset += stride
+
+    def flush(self, buf, x1, y1, x2, y2):
+        self.wait_for_flushing()
+        self.flushing = True
+        self.flushes += 1
+        self.flush_cb(self, Area(x1, y1, x2, y2), Pointer(buf))
+
+    def refresh(self):
+        invalid = self.invalid
+        self.invalid = []
+        if self.render_mode == DISPLAY_RENDER_MODE.FULL and invalid:
+            #The whole screen is rendered and flushed at once
+            buf = self.next_buffer()
+            for x1, y1, x2, y2, color in invalid:
+                self.render(buf, (y1 * self.width + x1) * 2, self.width * 2, x2 - x1 + 1, y2 - y1 + 1, color)
+            self.flush(buf, 0, 0, self.width - 1, self.height - 1)
+            return
+        for x1, y1, x2, y2, color in invalid:
+            width = x2 - x1 + 1
+            if self.render_mode == DISPLAY_RENDER_MODE.DIRECT:
+                #Areas are rendered at their place on the screen
+                buf = self.next_buffer()
+                self.render(buf, (y1 * self.width + x1) * 2, self.width * 2, width, y2 - y1 + 1, color)
+                self.flush(buf, x1, y1, x2, y2)
+                continue
+            max_rows = self.buf_size // (width * 2)
+            y = y1
+            while y <= y2:
+                rows = min(max_rows, y2 - y + 1)
+                buf = self.next_buffer()
+                self.render(buf, 0, width * 2, width, rows, color)
+                self.flush(buf, x1, y, x2, y + rows - 1)
+                y += rows
+
+    def next_buffer(self):
+        if len(self.buffers) == 1:
+            #The only buffer can't be rendered into while it is being sent
+            self.wait_for_flushing()
+            return self.buffers[0]
+        buf = self.buffers[self.buf_index]
+        self.buf_index ^= 1
+        return buf
+
+def display_create(width, height):
+    display = Display(width, height)
+    displays.append(display)
+    return display
+
+class Point(object):
+    def __init__(self):
+        self.x = 0
+        self.y = 0
+
+class IndevData(object):
+    def __init__(self):
+        self.point = Point()
+        self.state = INDEV_STATE.RELEASED
+        self.continue_reading = False
+
+class Timer(object):
+    def __init__(self):
+        self.paused = False
+        self.readies = 0
+
+    def pause(self):
+        self.paused = True
+
+    def resume(self):
+        self.paused = False
+
+    def ready(self):
+        self.readies += 1
+
+class Indev(object):
+    def __init__(self):
+        self.type = None
+        self.display = None
+        self.read_cb = None
+        self.read_timer = Timer()
+        self.readings = [] #(state, x, y, continue_reading) of every read_cb call
+
+    def set_type(self, indev_type):
+        self.type = indev_type
+
+    def set_display(self, display):
+        self.display = display
+
+    def set_read_cb(self, read_cb):
+        self.read_cb = read_cb
+
+    def get_read_timer(self):
+        return self.read_timer
+
+    def read(self):
+        while True:
+            data = IndevData()
+            self.read_cb(self, data)
+            self.readings.append((data.state, data.point.x, data.point.y, data.continue_reading))
+            if not data.continue_reading:
+                break
+
+def indev_create():
+    indev = Indev()
+    indevs.append(indev)
+    return indev
+
+def timer_handler():
+    """
+    Refreshes the displays, then reads the input devices whose read timer isn't paused. Returns TIMER_PERIOD,
+    or NO_TIMER_READY when every read timer is paused
+    """
+    for display in displays:
+        display.refresh()
+    delay = NO_TIMER_READY
+    for indev in indevs:
+        if not indev.read_timer.paused:
+            indev.read()
+            delay = TIMER_PERIOD
+    return delay
+
+def reset():
+    """
+    Forgets the displays and input devices of the previous driver
+    """
+    del displays[:]
+    del indevs[:]
@@ -0,0 +1,147 @@
+"""
+Checks of the LVGL driver on the simulated board (MI0283QT2_sim) with the lvgl stand-in lvgl_stub, no hardware or
+LVGL build needed. Runs like test_sim.py:
+
+    python -m pytest tests
+    python tests/test_lvgl.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import MI0283QT2_sim as sim
+sim.install()
+
+import time
+time.sleep_ms = lambda ms: None #reset delays aren't needed by the simulated controller
+
+import lvgl_stub as lv
+sys.modules["lvgl"] = lv
+
+from MI0283QT2_async import asyncio
+from MI0283QT2_lvgl import MI0283QT2_lvgl
+
+def driver(board, **kwargs):
+    lv.reset()
+    args = board.args()
+    args.update(kwargs)
+    return MI0283QT2_lvgl(**args)
+
+def test_sliced_flush_touch():
+    board = sim.Board()
+    #Slices of 10 lines, the touch screen is sampled between every two slices
+    disp = driver(board, buf_size=240 * 2 * 50, flush_slice=240 * 2 * 10, touch_period=0)
+    board.touch.press(2000, 2000)
+    disp.disp_drv.invalidate(0, 0, 239, 49, 0xF800)
+    disp.timer_handler()
+    assert board.panel.pixel(0, 0) == 0xF800
+    assert board.panel.pixel(239, 49) == 0xF800
+    assert board.panel.pixel(0, 50) == 0x0000
+    assert board.panel.errors == 0
+
+    #4 samples taken during the flush are reported in order, LVGL is told to read again until the last one
+    readings = lv.indevs[0].readings
+    assert len(readings) == 4
+    assert [r[3] for r in readings] == [True, True, True, False]
+    for r in readings:
+        assert r[0] == lv.INDEV_STATE.PRESSED
+        assert 0 <= r[1] < disp.width and 0 <= r[2] < disp.height
+
+    board.touch.release()
+    disp.timer_handler()
+    assert readings[-1][0] == lv.INDEV_STATE.RELEASED
+
+def test_async_flush():
+    board = sim.Board()
+    disp = driver(board, double_buffer=True, async_flush=True)
+    assert disp.flush_thread
+    disp.disp_drv.invalidate(0, 0, 239, 319, 0x07E0)
+    disp.timer_handler()
+    asyncio.run(disp.wait_flush())
+    assert disp.flush_data == None
+    #The whole screen in 10 areas, the last one waited for by wait_flush()
+    assert disp.disp_drv.flushes == 10
+    assert board.panel.pixel(0, 0) == 0x07E0
+    assert board.panel.pixel(239, 319) == 0x07E0
+    assert board.panel.pixels == disp.width * disp.height
+    assert board.spi.conflicts == 0
+
+def test_direct_swap_back():
+    board = sim.Board()
+    disp = driver(board, render_mode=lv.DISPLAY_RENDER_MODE.DIRECT, swapped_render=False)
+    assert disp.swap_bytes
+    disp.disp_drv.invalidate(10, 20, 19, 29, 0x1234)
+    disp.timer_handler()
+    before = bytes(disp.buf1)
+    disp.disp_drv.invalidate(100, 100, 109, 109, 0xABCD)
+    disp.timer_handler()
+    assert board.panel.pixel(10, 20) == 0x1234
+    assert board.panel.pixel(109, 109) == 0xABCD
+    #Only the new area changed in the render buffer, the sent areas are in LVGL byte order again
+    pos = (100 * disp.width + 100) * 2
+    assert disp.buf1[pos:pos + 2] == bytes((0xCD, 0xAB))
+    pos = (20 * disp.width + 10) * 2
+    assert disp.buf1[pos:pos + 2] == bytes((0x34, 0x12))
+    changed = [i for i in range(len(before)) if before[i] != disp.buf1[i]]
+    assert len(changed) == 10 * 10 * 2
+
+def test_frame_stats():
+    board = sim.Board()
+    disp = driver(board)
+    disp.timer_handler() #nothing to flush, no frame
+    disp.disp_drv.invalidate(0, 0, 239, 31, 0x001F)
+    disp.timer_handler()
+    stats = disp.frame_stats()
+    assert stats["frames"] == 1
+    assert stats["skipped"] == 0
+    #A tenth of the screen is in the second of 16 bins
+    assert stats["pixels"][1] == 1
+    assert sum(stats["render"]) == 1 and sum(stats["flush"]) == 1
+
+    #The next frame is due only a second after the last one
+    disp.set_max_fps(1)
+    disp.disp_drv.invalidate(0, 0, 239, 31, 0x001F)
+    assert disp.timer_handler() > 0
+    assert disp.frame_stats()["skipped"] == 1
+    #LVGL didn't run, the area is still waiting
+    assert disp.frame_stats()["frames"] == 1
+    assert len(disp.disp_drv.invalid) == 1
+
+    disp.reset_frame_stats()
+    assert disp.frame_stats()["frames"] == 0 and sum(disp.frame_stats()["pixels"]) == 0
+
+def test_run_touch_irq():
+    board = sim.Board(touch_irq=True)
+    disp = driver(board)
+    indev = lv.indevs[0]
+    read_timer = indev.get_read_timer()
+
+    async def main():
+        task = asyncio.create_task(disp.run())
+        await asyncio.sleep_ms(100)
+        #Released and reported, LVGL stops reading and the task sleeps until the pen interrupt
+        assert read_timer.paused
+        reads = len(indev.readings)
+        await asyncio.sleep_ms(100)
+        assert len(indev.readings) == reads
+
+        board.touch.press(2000, 2000)
+        await asyncio.sleep_ms(50)
+        assert not read_timer.paused
+        assert indev.readings[reads][0] == lv.INDEV_STATE.PRESSED
+
+        board.touch.release()
+        await asyncio.sleep_ms(100)
+        assert indev.readings[-1][0] == lv.INDEV_STATE.RELEASED
+        assert read_timer.paused
+        task.cancel()
+
+    asyncio.run(main())
+
+if __name__ == "__main__":
+    for name in sorted(dir()):
+        if name.startswith("test_"):
+            globals()[name]()
+            print(name, "ok")
@@ -0,0 +1,132 @@
+"""
+Regression checks of the drivers on the simulated board (MI0283QT2_sim), no hardware needed. Runs with pytest or
+directly under CPython or the MicroPython unix port:
+
+    python -m pytest tests
+    python tests/test_sim.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import MI0283QT2_sim as sim
+sim.install()
+
+import time
+time.sleep_ms = lambda ms: None #reset delays aren't needed by the simulated controller
+
+from MI0283QT2 import MI0283QT2
+
+def swap(color_rgb565):
+    #framebuf keeps RGB565 little endian, the driver sends the buffer as it is
+    return ((color_rgb565 & 0xFF) << 8) | (color_rgb565 >> 8)
+
+def test_fill_and_fill_rect():
+    board = sim.Board()
+    disp = MI0283QT2(**board.args())
+    disp.fill(0x001F)
+    disp.fill_rect(10, 20, 30, 40, 0xF800)
+    assert board.panel.pixel(0, 0) == 0x001F
+    assert board.panel.pixel(10, 20) == 0xF800
+    assert board.panel.pixel(39, 59) == 0xF800
+    assert board.panel.pixel(40, 59) == 0x001F
+    assert board.panel.pixel(39, 60) == 0x001F
+    assert board.panel.errors == 0
+
+def test_framebuffer_draw():
+    board = sim.Board()
+    disp = MI0283QT2(**board.args())
+    fbuf = disp.get_framebuf()
+    fbuf.fill(swap(0x0000))
+    fbuf.fill_rect(100, 50, 20, 10, swap(0x07E0))
+    disp.draw()
+    assert board.panel.pixel(100, 50) == 0x07E0
+    assert board.panel.pixel(119, 59) == 0x07E0
+    assert board.panel.pixel(120, 59) == 0x0000
+    assert board.panel.pixels == disp.width * disp.height
+
+def test_dirty_regions():
+    board = sim.Board()
+    disp = MI0283QT2(**board.args())
+    disp.draw()
+    board.reset_counters()
+    fbuf = disp.get_framebuf()
+    fbuf.fill_rect(0, 0, 10, 10, swap(0xFFFF))
+    fbuf.fill_rect(200, 300, 5, 4, swap(0xFFFF))
+    disp.mark_dirty(0, 0, 10, 10)
+    disp.mark_dirty(200, 300, 5, 4)
+    disp.draw()
+    #Only the two regions are sent
+    assert board.panel.pixels == 10 * 10 + 5 * 4
+    assert board.panel.pixel(9, 9) == 0xFFFF
+    assert board.panel.pixel(204, 303) == 0xFFFF
+    assert board.panel.pixel(10, 10) == 0x0000
+
+def test_touch():
+    board = sim.Board()
+    disp = MI0283QT2(**board.args())
+    assert disp.touch_read() == (-1, -1)
+    board.touch.press(1000, 1000)
+    first = disp.touch_read()
+    assert 0 <= first[0] < disp.width and 0 <= first[1] < disp.height
+    board.touch.press(3000, 3000)
+    second = disp.touch_read()
+    assert second != first
+    board.touch.release()
+    assert disp.touch_read() == (-1, -1)
+
+def test_touch_irq():
+    board = sim.Board(touch_irq=True)
+    disp = MI0283QT2(**board.args())
+    board.reset_counters()
+    #Polls while the screen isn't pressed cost no SPI traffic
+    for i in range(10):
+        assert disp.touch_read() == (-1, -1)
+    assert board.spi.transfers == 0
+
+    board.touch.press(1000, 1000)
+    assert disp.touch_read() != (-1, -1)
+    board.touch.release()
+    assert disp.touch_read() == (-1, -1)
+    #The release seen by the pen interrupt forgets the last point
+    assert disp.last_point == None
+
+def test_spi_counts():
+    board = sim.Board()
+    disp = MI0283QT2(**board.args())
+    disp.enable_stats()
+    disp.fill_rect(0, 0, 10, 10, 0xF800)
+    disp.reset_stats()
+    board.reset_counters()
+    disp.fill_rect(0, 0, 10, 10, 0x07E0)
+    stats = disp.stats()
+    #Same window again, the register shadow skips all window registers
+    assert stats["command"][0] == 0
+    assert stats["pixel_bytes"] == 200
+    assert stats["transfers"] == board.spi.transfers
+    assert stats["bytes"] == board.spi.bytes
+    assert stats["pixel_bytes"] + stats["command_bytes"] == stats["bytes"]
+    assert board.spi.conflicts == 0
+    disp.enable_stats(False)
+    assert disp.stats() == None
+
+def test_console():
+    from MI0283QT2_console import Console
+    board = sim.Board()
+    disp = MI0283QT2(**board.args())
+    console = Console(disp, top=0, height=100)
+    for i in range(15):
+        console.print("L%d" % i)
+    #10 lines fit, the screen shows lines 5 to 14 with the oldest at the top
+    code = 0
+    for i in range(8):
+        if board.panel.shown_pixel(8 + i, 2) == 0xFFFF:
+            code |= 1 << i
+    assert chr(code) == "5"
+
+if __name__ == "__main__":
+    for name in sorted(dir()):
+        if name.startswith("test_"):
+            globals()[name]()
+            print(name, "ok")
@@ -0,0 +1,107 @@
+"""
+Makes a sprite atlas file for MI0283QT2_sprite from images, runs on a PC with CPython.
+BMP files are read without other packages, other formats (PNG, GIF, ...) need Pillow.
+The name of a sprite is the file name without extension.
+
+    python tools/make_atlas.py -o icons.atlas --rle icons/*.png
+"""
+import argparse
+import os
+import struct
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+ATLAS_VERSION = 1
+FLAG_RLE = 1
+
+def read_image(path):
+    """
+    Returns (width, height, rows), rows are big endian RGB565 bytes
+    """
+    if path.lower().endswith(".bmp"):
+        from MI0283QT2_image import BMPReader
+        with open(path, "rb") as f:
+            image = BMPReader(f)
+            rows = b"".join([bytes(chunk) for chunk in image])
+        return image.width, image.height, rows
+
+    try:
+        from PIL import Image
+    except ImportError:
+        sys.exit("Pillow is needed to read %s, install it or convert the image to BMP" % path)
+    image = Image.open(path).convert("RGB")
+    rows = bytearray()
+    for r, g, b in image.getdata():
+        c = ((r & 0xF8) << 8) | ((g & 0xFC) << 3) | (b >> 3)
+        rows += bytes((c >> 8, c & 0xFF))
+    return image.width, image.height, bytes(rows)
+
+def encode_row(row):
+    """
+    Encodes one row, runs of 2 or more equal pixels become run packets, the rest literal packets
+    """
+    pixels = [row[i:i + 2] for i in range(0, len(row), 2)]
+    out = bytearray()
+    literal = []
+    i = 0
+    while i < len(pixels):
+        run = 1
+        while i + run < len(pixels) and run < 128 and pixels[i + run] == pixels[i]:
+            run += 1
+        if run >= 2:
+            if literal:
+                out += bytes((len(literal) - 1,)) + b"".join(literal)
+                literal = []
+            out += bytes((0x80 | (run - 1),)) + pixels[i]
+            i += run
+        else:
+            literal.append(pixels[i])
+            if len(literal) == 128:
+                out += bytes((127,)) + b"".join(literal)
+                literal = []
+            i += 1
+    if literal:
+        out += bytes((len(literal) - 1,)) + b"".join(literal)
+    return bytes(out)
+
+def encode_rle(width, height, rows):
+    row_size = width * 2
+    return b"".join([encode_row(rows[y * row_size:(y + 1) * row_size]) for y in range(height)])
+
+def make_atlas(paths, rle):
+    sprites = []
+    for path in paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+        width, height, data = read_image(path)
+        flags = 0
+        if rle:
+            encoded = encode_rle(width, height, data)
+            #RLE is only used when it makes the sprite smaller
+            if len(encoded) < len(data):
+                data = encoded
+                flags = FLAG_RLE
+        sprites.append((name.encode(), width, height, flags, data))
+
+    offset = 7 + sum([1 + len(s[0]) + 13 for s in sprites])
+    header = b"SPRA" + struct.pack("<BH", ATLAS_VERSION, len(sprites))
+    for name, width, height, flags, data in sprites:
+        header += struct.pack("<B", len(name)) + name
+        header += struct.pack("<HHBII", width, height, flags, offset, len(data))
+        offset += len(data)
+    return header + b"".join([s[4] for s in sprites])
+
+def main():
+    parser = argparse.ArgumentParser(description="Makes a sprite atlas for MI0283QT2_sprite")
+    parser.add_argument("images", nargs="+", help="image files, BMP or anything Pillow reads")
+    parser.add_argument("-o", "--output", required=True, help="atlas file")
+    parser.add_argument("--rle", action="store_true", help="run-length encode sprites where it saves space")
+    args = parser.parse_args()
+
+    atlas = make_atlas(args.images, args.rle)
+    with open(args.output, "wb") as f:
+        f.write(atlas)
+    print("%s: %d sprites, %d bytes" % (args.output, len(args.images), len(atlas)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Makes a font file for MI0283QT2_font from a BDF font, runs on a PC with CPython. Every glyph becomes a character
+cell of the font height (ascent + descent) and its advance width. TrueType fonts can be converted to BDF first,
+for example with otf2bdf.
+
+    python tools/make_font.py -o digits32.font --chars "0-9.:- " DejaVuSans-32.bdf
+"""
+import argparse
+import struct
+import sys
+
+FONT_VERSION = 1
+
+def parse_chars(spec):
+    """
+    Returns the character codes of spec, characters and ranges like "a-z", default printable ASCII
+    """
+    if spec == None:
+        return set(range(32, 127))
+    codes = set()
+    i = 0
+    while i < len(spec):
+        if i + 2 < len(spec) and spec[i + 1] == "-":
+            codes.update(range(ord(spec[i]), ord(spec[i + 2]) + 1))
+            i += 3
+        else:
+            codes.add(ord(spec[i]))
+            i += 1
+    return codes
+
+def read_bdf(path):
+    """
+    Returns (ascent, descent, glyphs), glyphs maps character codes to (advance, [width, height, x offset,
+    y offset], rows), rows of the bitmap are strings of "0" and "1"
+    """
+    ascent = None
+    descent = None
+    bbox = None
+    glyphs = {}
+    with open(path) as f:
+        lines = iter(f.read().splitlines())
+    for line in lines:
+        words = line.split()
+        if not words:
+            continue
+        if words[0] == "FONTBOUNDINGBOX":
+            bbox = [int(v) for v in words[1:5]]
+        elif words[0] == "FONT_ASCENT":
+            ascent = int(words[1])
+        elif words[0] == "FONT_DESCENT":
+            descent = int(words[1])
+        elif words[0] == "STARTCHAR":
+            code = -1
+            advance = None
+            char_bbox = bbox
+            for line in lines:
+                words = line.split()
+                if words[0] == "ENCODING":
+                    code = int(words[1])
+                elif words[0] == "DWIDTH":
+                    advance = int(words[1])
+                elif words[0] == "BBX":
+                    char_bbox = [int(v) for v in words[1:5]]
+                elif words[0] == "BITMAP":
+                    break
+            rows = []
+            for line in lines:
+                line = line.strip()
+                if line == "ENDCHAR":
+                    break
+                #Rows are hex digits padded to whole bytes
+                rows.append(bin(int(line, 16))[2:].zfill(len(line) * 4))
+            if advance == None:
+                advance = char_bbox[0] + max(char_bbox[2], 0)
+            if code >= 0:
+                glyphs[code] = (advance, char_bbox, rows)
+    if bbox == None:
+        sys.exit("%s is not a BDF font" % path)
+    if ascent == None:
+        ascent = bbox[1] + bbox[3]
+    if descent == None:
+        descent = -bbox[3]
+    return ascent, descent, glyphs
+
+def make_cell(glyph, ascent, height):
+    """
+    Returns (width, bitmap) of the character cell of glyph, bitmap rows are (width + 7) // 8 bytes
+    """
+    advance, (w, h, x_offset, y_offset), rows = glyph
+    x_offset = max(x_offset, 0)
+    #Cell is widened when the glyph reaches past its advance
+    width = max(advance, x_offset + w, 1)
+    top = ascent - (y_offset + h) #cell row of the first bitmap row
+    row_bytes = (width + 7) >> 3
+    bitmap = bytearray(row_bytes * height)
+    for j in range(h):
+        y = top + j
+        if y < 0 or y >= height or j >= len(rows):
+            continue
+        for i in range(w):
+            if i < len(rows[j]) and rows[j][i] == "1":
+                x = x_offset + i
+                bitmap[y * row_bytes + (x >> 3)] |= 0x80 >> (x & 7)
+    return width, bytes(bitmap)
+
+def make_font(path, chars):
+    ascent, descent, glyphs = read_bdf(path)
+    height = ascent + descent
+    if height < 1 or height > 255:
+        sys.exit("Font height %d is not supported" % height)
+    cells = []
+    for code in sorted(chars):
+        if code in glyphs and code <= 0xFFFF:
+            width, bitmap = make_cell(glyphs[code], ascent, height)
+            if width > 255:
+                sys.exit("Character %d is wider than 255 pixels" % code)
+            cells.append((code, width, bitmap))
+
+    offset = 8 + len(cells) * 7
+    header = b"MFNT" + struct.pack("<BBH", FONT_VERSION, height, len(cells))
+    for code, width, bitmap in cells:
+        header += struct.pack("<HBI", code, width, offset)
+        offset += len(bitmap)
+    return height, len(cells), header + b"".join([cell[2] for cell in cells])
+
+def main():
+    parser = argparse.ArgumentParser(description="Makes a font file for MI0283QT2_font from a BDF font")
+    parser.add_argument("font", help="BDF font file")
+    parser.add_argument("-o", "--output", required=True, help="font file")
+    parser.add_argument("--chars", help="characters to include, ranges like a-z allowed, default printable ASCII")
+    args = parser.parse_args()
+
+    height, count, font = make_font(args.font, parse_chars(args.chars))
+    with open(args.output, "wb") as f:
+        f.write(font)
+    print("%s: %d characters, %d pixels high, %d bytes" % (args.output, count, height, len(font)))
+
+if __name__ == "__main__":
+    main()